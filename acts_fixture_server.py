@@ -0,0 +1,128 @@
+import argparse
+import os
+import threading
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'acts_fixture')
+
+# The ACTS pages served by the fixture server, and whether each needs a logged in session
+FIXTURE_PAGES = {
+    '/login.asp': ('login.html', False),
+    '/default.asp': ('home.html', True),
+    '/myGames.asp': ('my_games.html', True),
+    '/gameDetail.asp': ('game.html', True),
+    '/discardsAll.asp': ('discards_all.html', True)
+}
+
+SESSION_COOKIE = 'ASPSESSIONID'
+
+
+class ActsFixtureHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def session_id(self):
+        for cookie in self.headers.get('Cookie', '').split(';'):
+            name, _, value = cookie.strip().partition('=')
+
+            if name == SESSION_COOKIE:
+                return value
+
+        return None
+
+    def send_page(self, file_name: str, headers: dict = None):
+        with open(os.path.join(FIXTURE_DIR, file_name), 'rb') as f:
+            page = f.read()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(page)))
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(page)
+
+    def redirect(self, location: str, headers: dict = None):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.end_headers()
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.server.request_counts[path] += 1
+
+        if path not in FIXTURE_PAGES:
+            self.send_error(404)
+            return
+
+        file_name, needs_session = FIXTURE_PAGES[path]
+
+        # Like ACTS, a missing or expired session is sent back to the login page
+        if needs_session & (self.session_id() not in self.server.sessions):
+            self.redirect('login.asp')
+            return
+
+        self.send_page(file_name)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        self.server.request_counts[path] += 1
+
+        if path != '/login.asp':
+            self.send_error(404)
+            return
+
+        form = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+
+        if (form.get('alias', [''])[0] == '') | (form.get('password', [''])[0] == ''):
+            self.send_page('login.html')
+            return
+
+        session_id = uuid.uuid4().hex
+        self.server.sessions.add(session_id)
+
+        self.redirect('default.asp', headers={'Set-Cookie': f'{SESSION_COOKIE}={session_id}; path=/'})
+
+
+class ActsFixtureServer(ThreadingHTTPServer):
+
+    def __init__(self, port: int = 0):
+        super().__init__(('127.0.0.1', port), ActsFixtureHandler)
+        self.sessions = set()
+        self.request_counts = Counter()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/'
+
+    def expire_sessions(self):
+        self.sessions.clear()
+
+
+def start_fixture_server(port: int = 0):
+    # Serves the recorded pages from a background thread, for offline use of the cards tab
+    server = ActsFixtureServer(port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded ACTS pages for offline card analysis')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    args = parser.parse_args()
+
+    server = ActsFixtureServer(args.port)
+    print(f'Serving ACTS fixture pages at {server.base_url}, start the app with ACTS_URL={server.base_url}')
+    server.serve_forever()
@@ -0,0 +1,222 @@
+import codecs
+import hashlib
+import os
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from result_cache import ResultCache
+
+# The ACTS server can be swapped for the local fixture server with the ACTS_URL environment variable
+ACTS_URL = os.environ.get('ACTS_URL', 'http://acts.warhorsesim.com/')
+
+DISCARDS_TTL = 30.0
+
+# The session manager is created once per process
+session_manager = None
+
+
+class DiscardParser(HTMLParser):
+    # Collects the card id cells of the discard tables as the page is fed in, without building a document tree. The
+    # first discard table holds the Japanese discards, and the second the Allied discards.
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.table_stack = []
+        self.discard_table_count = 0
+        self.cell_text = None
+        self.records = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+
+        if tag == 'table':
+            is_discard_table = (attrs.get('border') == '0') & (attrs.get('cellpadding') == '3') & \
+                (attrs.get('width') == '100%')
+
+            if is_discard_table:
+                self.discard_table_count += 1
+
+            self.table_stack.append(self.discard_table_count - 1 if is_discard_table else None)
+        elif (tag == 'td') & (self.player_id() is not None):
+            is_card_cell = ('textcenter' in (attrs.get('class') or '').split()) & (attrs.get('width') == '10%')
+            self.cell_text = [] if is_card_cell else None
+
+    def handle_endtag(self, tag):
+        if (tag == 'td') & (self.cell_text is not None):
+            self.records.append({'player_id': self.player_id(), 'card_id': int(''.join(self.cell_text))})
+            self.cell_text = None
+        elif (tag == 'table') & (len(self.table_stack) > 0):
+            self.table_stack.pop()
+
+    def handle_data(self, data):
+        if self.cell_text is not None:
+            self.cell_text.append(data)
+
+    def player_id(self):
+        # The nearest enclosing discard table
+        for player_id in reversed(self.table_stack):
+            if player_id is not None:
+                return player_id
+
+        return None
+
+
+def iter_discards(chunks):
+    # Yields each discard record as soon as the chunk holding it has been parsed, e.g. from
+    # iter(lambda: response.read(65536), b'')
+    parser = DiscardParser()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+
+        yield from parser.records
+        parser.records.clear()
+
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+
+    yield from parser.records
+
+
+def parse_discards(page, chunk_size: int = 65536):
+    return list(iter_discards(page[i:i + chunk_size] for i in range(0, len(page), chunk_size)))
+
+
+class ActsSession:
+
+    def __init__(self, user_name: str, pw: str, base_url: str = None):
+        import mechanize
+        import http.cookiejar as cj
+
+        self.user_name = user_name
+        self.pw = pw
+        self.base_url = ACTS_URL if base_url is None else base_url
+
+        self.browser = mechanize.Browser()
+        self.browser.set_cookiejar(cj.CookieJar())
+
+        self.logged_in = False
+        self.login_count = 0
+
+        # The discards page of each game, so a refresh is a single request once the game has been found
+        self.discard_urls = {}
+
+        # A mechanize browser holds the current page, so one request at a time goes through a session
+        self.lock = threading.Lock()
+
+    def login(self):
+        self.browser.open(urljoin(self.base_url, 'login.asp'))
+        self.browser.select_form(nr=0)
+        self.browser.form['alias'] = self.user_name
+        self.browser.form['password'] = self.pw
+        self.browser.submit()
+
+        self.logged_in = True
+        self.login_count += 1
+
+    def find_discard_url(self, game_name: str):
+        import mechanize
+
+        try:
+            self.browser.open(urljoin(self.base_url, 'myGames.asp?moduleID=19'))
+            self.browser.follow_link(text=game_name)
+            self.browser.follow_link(url='discardsAll.asp')
+        except mechanize.LinkNotFoundError:
+            return None
+
+        return self.browser.geturl()
+
+    def session_expired(self):
+        # ACTS sends an expired session back to the login page
+        return 'login.asp' in self.browser.geturl()
+
+    def discards_page(self, game_name: str):
+        with self.lock:
+            # A second attempt logs in again, in case the server expired the session
+            for attempt in range(2):
+                if not self.logged_in:
+                    self.login()
+
+                if game_name in self.discard_urls:
+                    self.browser.open(self.discard_urls[game_name])
+                else:
+                    discard_url = self.find_discard_url(game_name)
+
+                    if discard_url is not None:
+                        self.discard_urls[game_name] = discard_url
+
+                if (game_name in self.discard_urls) & (not self.session_expired()):
+                    return self.browser.response().read()
+
+                self.logged_in = False
+                self.discard_urls.pop(game_name, None)
+
+        raise ValueError(f'The discards of game {game_name} could not be retrieved for {self.user_name}')
+
+
+class ActsSessionManager:
+
+    def __init__(self, base_url: str = None, ttl: float = DISCARDS_TTL, max_sessions: int = 32,
+                 max_games: int = 128):
+        self.base_url = ACTS_URL if base_url is None else base_url
+        self.ttl = ttl
+
+        # Logged in sessions, reused across requests for the same credentials
+        self.sessions = ResultCache(max_size=max_sessions)
+
+        # (fetched at, page checksum, parsed discards) for each set of credentials and game, the least recently used
+        # games are evicted like the sessions
+        self.discards = ResultCache(max_size=max_games)
+
+        self.lock = threading.Lock()
+
+    def credential_key(self, user_name: str, pw: str):
+        return user_name, hashlib.sha256(pw.encode()).hexdigest()
+
+    def get_session(self, user_name: str, pw: str):
+        key = self.credential_key(user_name, pw)
+
+        with self.lock:
+            session = self.sessions.get(key)
+
+            if session is None:
+                session = ActsSession(user_name, pw, base_url=self.base_url)
+                self.sessions.put(key, session)
+
+        return session
+
+    def retrieve_discards(self, user_name: str, pw: str, game_name: str):
+        key = self.credential_key(user_name, pw) + (game_name,)
+        cached = self.discards.get(key)
+
+        fetched_at, previous_checksum, card_list = (0.0, None, None) if cached is None else cached
+
+        if (card_list is not None) & (time.monotonic() - fetched_at < self.ttl):
+            return card_list
+
+        page = self.get_session(user_name, pw).discards_page(game_name)
+        checksum = hashlib.sha256(page).hexdigest()
+
+        # A stale entry is only parsed again when the page changed since it was fetched
+        if checksum != previous_checksum:
+            card_list = parse_discards(page)
+
+        self.discards.put(key, (time.monotonic(), checksum, card_list))
+
+        return card_list
+
+    def clear(self):
+        with self.lock:
+            self.sessions.clear()
+            self.discards.clear()
+
+
+def load_session_manager():
+    global session_manager
+
+    if session_manager is None:
+        session_manager = ActsSessionManager()
+
+    return session_manager
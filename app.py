@@ -1,18 +1,19 @@
-import copy
 import math
 import dash
 import dash_bootstrap_components as dbc
 from dash import html
 from dash import dcc
-from dash.dependencies import Input, Output, State, MATCH, ALL
-import plotly.graph_objs as go
-import pandas as pd
+from dash.dependencies import Input, Output, State, MATCH, ALL, ClientsideFunction
 from dash.exceptions import PreventUpdate
-from combat_unit import CombatUnit
+from flask import request
+from flask_compress import Compress
+from combat_force import CombatForce
 from battle_analyzer import BattleAnalyzer
-from card_analyzer import CardAnalyzer
+from result_cache import ResultCache
+import plots
+from sprite_atlas import load_sprite_manifest, is_hashed_asset, sprite_style
+from unit_registry import load_registry
 import enums
-import json
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = 'EOTS'
@@ -20,144 +21,93 @@ app._favicon = 'static/images/EnterpriseF.gif'
 
 server = app.server
 
-units = pd.read_csv('data/unit_data.csv')
-units['unit_id'] = units.index
+# Callback responses and the layout are JSON, which compresses well
+Compress(server)
 
-an_units = units.loc[units['unit_type'] != 'Ground']
 
-allied_units = an_units.loc[an_units['nationality'] != 'Japan']
-japan_units = an_units.loc[an_units['nationality'] == 'Japan']
+@server.after_request
+def cache_hashed_assets(response):
+    # The sprite atlas URL changes with its content, so the browser can keep it for good
+    if is_hashed_asset(request.path):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
 
-allied_unit_list = [CombatUnit(**kwargs) for kwargs in allied_units.to_dict(orient='records')]
-japan_unit_list = [CombatUnit(**kwargs) for kwargs in japan_units.to_dict(orient='records')]
+    return response
 
-allied_options = []
-
-for unit in allied_unit_list:
-    allied_options.append({"label": unit.unit_name, "value": unit.unit_id})
-
-japan_options = []
-
-for unit in japan_unit_list:
-    japan_options.append({"label": unit.unit_name, "value": unit.unit_id})
-
-
-def plot_expected_winner(df_results):
-    df_winner = df_results.groupby(['battle_winner'], as_index=False).agg(winner_count=('battle_winner', 'count'))
-
-    x = df_winner['battle_winner']
-    y = df_winner['winner_count'].apply(lambda z: z / 100)
 
-    graph = go.Bar(
-        x=x,
-        y=y,
-        name='Expected Battle Outcome',
-        marker=dict(color='lightgreen'),
-        text=y.apply(lambda z: '{0:.0f}%'.format(z * 100))
-    )
-
-    layout = go.Layout(
-        paper_bgcolor='#27293d',
-        plot_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(type='category', title='Battle Winner'),
-        yaxis=dict(range=[0, 1], tickformat=".0%", title='Outcome Probability'),
-        font=dict(color='white'),
-        title='Expected Battle Outcome',
-        transition={'duration': 500, 'easing': 'cubic-in-out'},
-    )
-
-    return {'data': [graph], 'layout': layout}
-
-
-def plot_expected_losses(df_results):
-    df_losses_allies = df_results.groupby(['allied_damage_applied'], as_index=False).agg(
-        damage_count=('allied_damage_applied', 'count'))
+battle_results_cache = ResultCache(max_size=512)
 
-    df_losses_allies = df_losses_allies.rename(columns={'allied_damage_applied': 'damage_applied'})
-    df_losses_allies['player'] = enums.Player.ALLIES.name
+unit_registry = load_registry()
 
-    df_losses_japan = df_results.groupby(['japan_damage_applied'], as_index=False).agg(
-        damage_count=('japan_damage_applied', 'count'))
+# The static part of every figure goes out with the page layout, the callbacks only send the trace arrays
+figures = plots.load_figures()
 
-    df_losses_japan = df_losses_japan.rename(columns={'japan_damage_applied': 'damage_applied'})
-    df_losses_japan['player'] = enums.Player.JAPAN.name
+an_unit_types = [enums.UnitType.AIR, enums.UnitType.NAVAL]
 
-    df_losses = pd.concat([df_losses_allies, df_losses_japan], ignore_index=True)
+allied_unit_list = unit_registry.find(player=enums.Player.ALLIES, unit_type=an_unit_types)
+japan_unit_list = unit_registry.find(player=enums.Player.JAPAN, unit_type=an_unit_types)
 
-    df_pivot = pd.pivot_table(df_losses, index=['player'], columns=['damage_applied'], values=['damage_count'],
-                              aggfunc=sum, fill_value=0)
-
-    x_values = []
-    for x in df_pivot.columns:
-        x_values.append(x[1])
-
-    x_allies = pd.DataFrame(x_values)[0]
-    y_allies = pd.DataFrame(df_pivot.values[0])[0].apply(lambda z: z / 100)
-
-    x_japan = pd.DataFrame(x_values)[0]
-    y_japan = pd.DataFrame(df_pivot.values[1])[0].apply(lambda z: z / 100)
+allied_options = []
 
-    graph = [
-        go.Bar(
-            x=x_allies,
-            y=y_allies,
-            offsetgroup=0,
-            name=enums.Player.ALLIES.name,
-            marker=dict(color='lightgreen'),
-            text=y_allies.apply(lambda z: '{0:.0f}%'.format(z * 100))
-        ),
-        go.Bar(
-            x=x_japan,
-            y=y_japan,
-            offsetgroup=1,
-            name=enums.Player.JAPAN.name,
-            marker=dict(color='lightblue'),
-            text=y_japan.apply(lambda z: '{0:.0f}%'.format(z * 100))
-        ),
-    ]
+for unit in allied_unit_list:
+    allied_options.append({"label": unit.unit_name, "value": unit.unit_id})
 
-    layout = go.Layout(
-        paper_bgcolor='#27293d',
-        plot_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(type='category', title='Battle Losses'),
-        yaxis=dict(range=[0, 1], tickformat=".0%", title='Loss Probability'),
-        font=dict(color='white'),
-        title='Expected Battle Losses',
-        transition={'duration': 500, 'easing': 'cubic-in-out'},
-    )
+japan_options = []
 
-    layout.update(title=dict(x=0.5))
+for unit in japan_unit_list:
+    japan_options.append({"label": unit.unit_name, "value": unit.unit_id})
 
-    return go.Figure(
-        data=graph,
-        layout=layout
-    )
 
+def build_combat_force(force_state):
+    # force_state is the per side store kept in the browser: the selected unit ids, and the state of each unit
+    if not force_state:
+        return CombatForce([])
 
-def plot_card_analysis(df_results, player: enums.Player):
-    x = df_results['attribute']
-    y = df_results['probability']
+    return CombatForce(unit_registry.get_units(force_state['unit_ids']), is_flipped=force_state['is_flipped'],
+                       is_in_battle_hex=force_state['is_in_battle_hex'],
+                       is_extended_range=force_state['is_extended_range'],
+                       attack_modifier=force_state['attack_modifier'])
 
-    graph = go.Bar(
-        x=x,
-        y=y,
-        name='Card Attribute Probability',
-        marker=dict(color='lightgreen'),
-        text=y.apply(lambda z: '{0:.0f}%'.format(z * 100))
-    )
 
-    layout = go.Layout(
-        paper_bgcolor='#27293d',
-        plot_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(type='category', title='Card Attribute'),
-        yaxis=dict(range=[0, 1], tickformat=".0%", title='Probability of Drawing 1+ Cards w/ Attribute'),
-        font=dict(color='white'),
-        title=f'{player.name} Hand Analysis',
-        transition={'duration': 500, 'easing': 'cubic-in-out'},
+def unit_card(player_prefix: str, selected_unit):
+    # The cards are rendered in the browser by eots.unit_card in assets/force_state.js, this is the server side
+    # reference it is checked against
+    return html.Div(children=
+    [
+        dbc.Row(
+            [
+                dbc.Col(width=4, children=html.Div(
+                    [
+                        html.Div(id={'type': f'{player_prefix}-image', 'index': selected_unit.unit_id},
+                                 style=sprite_style(selected_unit.image_name_front)),
+                        html.P(),
+                        html.Div([
+                            dbc.Label(f'CF: {selected_unit.combat_factor()}'),
+                        ],
+                            id={'type': f'{player_prefix}-cf', 'index': selected_unit.unit_id}
+                        ),
+                    ]
+                )),
+                dbc.Col(width=8, children=html.Div(
+                    [
+                        dbc.Checkbox(id={'type': f'{player_prefix}-unit-flipped', 'index': selected_unit.unit_id},
+                                     label='Flipped?', value=False),
+                        dbc.Checkbox(id={'type': f'{player_prefix}-unit-extended', 'index': selected_unit.unit_id},
+                                     label='Extended Range?', value=False,
+                                     disabled=(True if math.isnan(selected_unit.move_range_extended) else False)),
+                        dbc.Checkbox(id={'type': f'{player_prefix}-unit-battle-hex', 'index': selected_unit.unit_id},
+                                     label='In Battle Hex?', value=selected_unit.is_in_battle_hex),
+                        html.P("EC Modifier:", className="m-0"),
+                        dbc.Input(id={'type': f'{player_prefix}-unit-mod', 'index': selected_unit.unit_id},
+                                  type='number', min=-2, max=2, step=1, value=0)
+                    ]
+                ))
+            ]
+        )
+    ],
+        className='p-1 m-1 bg-light border rounded-3 border-primary',
+        id={'type': f'{player_prefix}-combat-unit', 'index': selected_unit.unit_id},
     )
 
-    return {'data': [graph], 'layout': layout}
-
 
 """Navbar"""
 APP_LOGO = "assets/static/images/eots.png"
@@ -283,6 +233,12 @@ analyze_button = html.Div(
     ]
 )
 
+sweep_button = html.Div(
+    [
+        dbc.Button("Sweep Modifiers", id='sweep-battle', color="primary", className="me-1"),
+    ]
+)
+
 allied_selected_units = html.Div(
     [
         dcc.Dropdown(id="allied-selected-units", multi=True, options=allied_options, className="dash-bootstrap"),
@@ -313,6 +269,8 @@ body_combat = html.Div(
                         japan_ec_mod,
                         html.P(),
                         analyze_button,
+                        html.P(),
+                        sweep_button,
                     ],
                         className="p-2 bg-light border rounded-3 border-primary")),
                 ]), width=2),
@@ -341,12 +299,17 @@ body_combat = html.Div(
                     ]),
                     html.P(),
                     dbc.Row(html.Div([
-                        dcc.Graph(id='expected-losses', animate=False,
+                        dcc.Graph(id='expected-losses', animate=False, figure=figures['expected-losses'],
+                                  style={'backgroundColor': '#1a2d46', 'color': '#ffffff'})
+                    ])),
+                    html.P(),
+                    dbc.Row(html.Div([
+                        dcc.Graph(id='expected-winner', animate=False, figure=figures['expected-winner'],
                                   style={'backgroundColor': '#1a2d46', 'color': '#ffffff'})
                     ])),
                     html.P(),
                     dbc.Row(html.Div([
-                        dcc.Graph(id='expected-winner', animate=False,
+                        dcc.Graph(id='modifier-sweep', animate=False, figure=figures['modifier-sweep'],
                                   style={'backgroundColor': '#1a2d46', 'color': '#ffffff'})
                     ])),
                 ], className="p-2 bg-light border rounded-3 border-primary"), width=8),
@@ -415,6 +378,8 @@ analyze_cards_button = html.Div(
     ]
 )
 
+card_job_status = html.Div(id='card-job-status', className="m-0")
+
 body_cards = html.Div(
     [
         dbc.Row(
@@ -435,17 +400,19 @@ body_cards = html.Div(
                         japan_hand_size,
                         html.P(),
                         analyze_cards_button,
+                        html.P(),
+                        card_job_status,
                     ],
                         className="p-2 bg-light border rounded-3 border-primary")),
                 ]), width=2),
                 dbc.Col(html.Div([
                     dbc.Row(html.Div([
-                        dcc.Graph(id='allied-probability', animate=False,
+                        dcc.Graph(id='allied-probability', animate=False, figure=figures['allied-probability'],
                                   style={'backgroundColor': '#1a2d46', 'color': '#ffffff'})
                     ])),
                     html.P(),
                     dbc.Row(html.Div([
-                        dcc.Graph(id='japan-probability', animate=False,
+                        dcc.Graph(id='japan-probability', animate=False, figure=figures['japan-probability'],
                                   style={'backgroundColor': '#1a2d46', 'color': '#ffffff'})
                     ])), ], className="p-2 bg-light border rounded-3 border-primary"), width=8),
                 dbc.Col(html.Div(""), width=1),
@@ -487,8 +454,14 @@ tabs = dbc.Tabs(
 app.layout = html.Div([
     navbar,
     tabs,
-    dcc.Store(id='allied-combat-force'),
-    dcc.Store(id='japan-combat-force')
+    dcc.Store(id='allied-force'),
+    dcc.Store(id='japan-force'),
+    dcc.Store(id='unit-stats', data=unit_registry.combat_stats()),
+    dcc.Store(id='unit-cards', data=unit_registry.card_stats()),
+    dcc.Store(id='unit-sprites', data=load_sprite_manifest()),
+    dcc.Store(id='card-job'),
+    *[dcc.Store(id=f'{graph_id}-traces') for graph_id in figures],
+    dcc.Interval(id='card-job-poll', interval=1000, disabled=True)
 ])
 
 
@@ -504,452 +477,221 @@ def toggle_navbar_collapse(n, is_open):
     return is_open
 
 
-@app.callback(
-    [Output('allied-forces', 'children'), Output('allied-combat-force', 'data')],
-    [Input('allied-selected-units', 'value'), Input('allied-combat-force', 'data')],
-    State('allied-forces', 'children')
-)
-def update_allied_selected_units(value, json_data, children):
-    # Determine if there are items in the value list that are not in the allied_combat_force list
-    # Any differences need to be added to the UI
-    if value:
-        ui_indexes = set(value)
-    else:
-        ui_indexes = set()
-
-    if json_data:
-        unit_ids = json.loads(json_data)
-    else:
-        unit_ids = []
-
-    missing_unit_ids = ui_indexes.difference(set(unit_ids))
-
-    while len(missing_unit_ids) > 0:
-
-        index = missing_unit_ids.pop()
-        selected_unit = next((x for x in allied_unit_list if x.unit_id == index), None)
-
-        if selected_unit:
-            new_element = html.Div(children=
-            [
-                dbc.Row(
-                    [
-                        dbc.Col(width=4, children=html.Div(
-                            [
-                                html.Img(id={'type': 'allied-image', 'index': selected_unit.unit_id},
-                                         src=f'assets/static/images/{selected_unit.image_name_front}'),
-                                html.P(),
-                                html.Div([
-                                    dbc.Label(f'CF: {selected_unit.combat_factor()}'),
-                                ],
-                                    id={'type': 'allied-cf', 'index': selected_unit.unit_id}
-                                ),
-                            ]
-                        )),
-                        dbc.Col(width=8, children=html.Div(
-                            [
-                                dbc.Checkbox(id={'type': 'allied-unit-flipped', 'index': selected_unit.unit_id},
-                                             label='Flipped?', value=False),
-                                dbc.Checkbox(id={'type': 'allied-unit-extended', 'index': selected_unit.unit_id},
-                                             label='Extended Range?', value=False,
-                                             disabled=(
-                                                 True if math.isnan(selected_unit.move_range_extended) else False)),
-                                dbc.Checkbox(id={'type': 'allied-unit-battle-hex', 'index': selected_unit.unit_id},
-                                             label='In Battle Hex?', value=selected_unit.is_in_battle_hex),
-                                html.P("EC Modifier:", className="m-0"),
-                                dbc.Input(id={'type': 'allied-unit-mod', 'index': selected_unit.unit_id},
-                                          type='number', min=-2, max=2, step=1, value=0)
-                            ]
-                        ))
-                    ]
-                )
-            ],
-                className='p-1 m-1 bg-light border rounded-3 border-primary',
-                id={'type': 'allied-combat-unit', 'index': selected_unit.unit_id},
-            )
-
-            children.append(new_element)
-            unit_ids.append(selected_unit.unit_id)
-
-    # Determine if there are values in allied_combat_force list that are not in the value list
-    # Any differences need to be removed from the UI
-    extra_unit_ids = set(unit_ids).difference(ui_indexes)
-
-    while len(extra_unit_ids) > 0:
-        unit_id = extra_unit_ids.pop()
-
-        for i in range(len(children)):
-            child = children[i]
-            index = child['props']['id']['index']
-
-            if index == unit_id:
-
-                for j in range(len(unit_ids)):
-                    if unit_ids[j] == unit_id:
-                        unit_ids.pop(j)
-                        break
-
-                children.pop(i)
-                break
-
-    return [children, json.dumps(unit_ids)]
-
-
-@app.callback(
-    [Output('japan-forces', 'children'), Output('japan-combat-force', 'data')],
-    [Input('japan-selected-units', 'value'), Input('japan-combat-force', 'data')],
-    State('japan-forces', 'children')
-)
-def update_japan_selected_units(value, json_data, children):
-    # Determine if there are items in the value list that are not in the japan_combat_force list
-    # Any differences need to be added to the UI
-    if value:
-        ui_indexes = set(value)
-    else:
-        ui_indexes = set()
-
-    if json_data:
-        unit_ids = json.loads(json_data)
-    else:
-        unit_ids = []
-
-    missing_unit_ids = ui_indexes.difference(set(unit_ids))
-
-    while len(missing_unit_ids) > 0:
-
-        index = missing_unit_ids.pop()
-        selected_unit = next((x for x in japan_unit_list if x.unit_id == index), None)
-
-        if selected_unit:
-            new_element = html.Div(children=
-            [
-                dbc.Row(
-                    [
-                        dbc.Col(width=4, children=html.Div(
-                            [
-                                html.Img(id={'type': 'japan-image', 'index': selected_unit.unit_id},
-                                         src=f'assets/static/images/{selected_unit.image_name_front}'),
-                                html.P(),
-                                html.Div([
-                                    dbc.Label(f'CF: {selected_unit.combat_factor()}'),
-                                ],
-                                    id={'type': 'japan-cf', 'index': selected_unit.unit_id}
-                                ),
-                            ]
-                        )),
-                        dbc.Col(width=8, children=html.Div(
-                            [
-                                dbc.Checkbox(id={'type': 'japan-unit-flipped', 'index': selected_unit.unit_id},
-                                             label='Flipped?', value=False),
-                                dbc.Checkbox(id={'type': 'japan-unit-extended', 'index': selected_unit.unit_id},
-                                             label='Extended Range?', value=False,
-                                             disabled=(
-                                                 True if math.isnan(selected_unit.move_range_extended) else False)),
-                                dbc.Checkbox(id={'type': 'japan-unit-battle-hex', 'index': selected_unit.unit_id},
-                                             label='In Battle Hex?', value=selected_unit.is_in_battle_hex),
-                                html.P("EC Modifier:", className="m-0"),
-                                dbc.Input(id={'type': 'japan-unit-mod', 'index': selected_unit.unit_id},
-                                          type='number', min=-2, max=2, step=1, value=0)
-                            ]
-                        ))
-                    ]
-                )
-            ],
-                className='p-1 m-1 bg-light border rounded-3 border-primary',
-                id={'type': 'japan-combat-unit', 'index': selected_unit.unit_id},
-            )
-
-            children.append(new_element)
-            unit_ids.append(selected_unit.unit_id)
-
-    # Determine if there are values in japan_combat_force list that are not in the value list
-    # Any differences need to be removed from the UI
-    extra_unit_ids = set(unit_ids).difference(ui_indexes)
-
-    while len(extra_unit_ids) > 0:
-        unit_id = extra_unit_ids.pop()
-
-        for i in range(len(children)):
-            child = children[i]
-            index = child['props']['id']['index']
-
-            if index == unit_id:
-
-                for j in range(len(unit_ids)):
-                    if unit_ids[j] == unit_id:
-                        unit_ids.pop(j)
-                        break
-
-                children.pop(i)
-                break
-
-    return [children, json.dumps(unit_ids)]
-
-
-@app.callback(
-    Output({'type': 'allied-image', 'index': MATCH}, 'src'),
-    Input({'type': 'allied-unit-flipped', 'index': MATCH}, 'value'),
-    State({'type': 'allied-unit-flipped', 'index': MATCH}, 'id'),
-)
-def toggle_allied_unit_flipped(value, id):
-    index = id.get('index')
-
-    if not index:
-        raise PreventUpdate
-
-    selected_unit = next((x for x in allied_unit_list if x.unit_id == index), None)
+# The unit cards and the per side force state are kept in the browser, see assets/force_state.js, so adding or
+# removing a unit doesn't send the whole force to the server and back. The server callbacks read the force state store.
+for player_prefix in ['allied', 'japan']:
+    app.clientside_callback(
+        ClientsideFunction(namespace='eots', function_name=f'{player_prefix}_unit_cards'),
+        Output(f'{player_prefix}-forces', 'children'),
+        Input(f'{player_prefix}-selected-units', 'value'),
+        [State(f'{player_prefix}-forces', 'children'), State('unit-stats', 'data'), State('unit-cards', 'data'),
+         State('unit-sprites', 'data')]
+    )
 
-    if value:
-        src = f'assets/static/images/{selected_unit.image_name_back}'
-    else:
-        src = f'assets/static/images/{selected_unit.image_name_front}'
+    app.clientside_callback(
+        ClientsideFunction(namespace='eots', function_name='unit_image'),
+        Output({'type': f'{player_prefix}-image', 'index': MATCH}, 'style'),
+        Input({'type': f'{player_prefix}-unit-flipped', 'index': MATCH}, 'value'),
+        [State({'type': f'{player_prefix}-unit-flipped', 'index': MATCH}, 'id'), State('unit-cards', 'data'),
+         State('unit-sprites', 'data')]
+    )
 
-    return src
+    app.clientside_callback(
+        ClientsideFunction(namespace='eots', function_name='force_state'),
+        Output(f'{player_prefix}-force', 'data'),
+        [Input({'type': f'{player_prefix}-unit-flipped', 'index': ALL}, 'value'),
+         Input({'type': f'{player_prefix}-unit-battle-hex', 'index': ALL}, 'value'),
+         Input({'type': f'{player_prefix}-unit-extended', 'index': ALL}, 'value'),
+         Input({'type': f'{player_prefix}-unit-mod', 'index': ALL}, 'value')],
+        State({'type': f'{player_prefix}-unit-flipped', 'index': ALL}, 'id')
+    )
 
 
-@app.callback(
+# The CF labels are computed in the browser from the unit stats table, see assets/combat_factor.js. The server
+# side reference is CombatUnit.combat_factor and CombatForce.total_combat_factor.
+app.clientside_callback(
+    ClientsideFunction(namespace='eots', function_name='unit_cf'),
     Output({'type': 'allied-cf', 'index': MATCH}, 'children'),
     [Input({'type': 'allied-unit-flipped', 'index': MATCH}, 'value'),
      Input({'type': 'allied-unit-battle-hex', 'index': MATCH}, 'value'),
      Input({'type': 'allied-unit-extended', 'index': MATCH}, 'value'),
      Input({'type': 'allied-unit-mod', 'index': MATCH}, 'value')],
-    State({'type': 'allied-unit-flipped', 'index': MATCH}, 'id'),
+    [State({'type': 'allied-unit-flipped', 'index': MATCH}, 'id'),
+     State('unit-stats', 'data')]
 )
-def update_allied_unit_cf(is_flipped, is_battle_hex, is_extended, modifier, is_flipped_id):
-    index = is_flipped_id.get('index')
-
-    if not index:
-        raise PreventUpdate
 
-    selected_unit = next((x for x in allied_unit_list if x.unit_id == index), None)
-    selected_unit_copy = copy.deepcopy(selected_unit)
-
-    selected_unit_copy.is_flipped = is_flipped
-    selected_unit_copy.is_in_battle_hex = is_battle_hex
-    selected_unit_copy.is_extended_range = is_extended
-    selected_unit_copy.attack_modifier = modifier
-
-    cf = dbc.Label(f'CF: {selected_unit_copy.combat_factor()}')
-
-    return cf
-
-
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='eots', function_name='allied_total_cf'),
     Output('allied-total-cf', 'children'),
-    [Input({'type': 'allied-unit-flipped', 'index': ALL}, 'value'),
-     Input({'type': 'allied-unit-battle-hex', 'index': ALL}, 'value'),
-     Input({'type': 'allied-unit-extended', 'index': ALL}, 'value'),
-     Input({'type': 'allied-unit-mod', 'index': ALL}, 'value'),
-     Input('allied-combat-force', 'data')]
+    Input('allied-force', 'data'),
+    State('unit-stats', 'data')
 )
-def update_allied_total_cf(is_flipped, is_battle_hex, is_extended, modifier, json_data):
-    index_list = json.loads(json_data)
-    unit_list = []
-
-    for i in range(len(index_list)):
-        index = index_list[i]
-        current_unit = next((x for x in allied_unit_list if x.unit_id == index), None)
-        current_unit_copy = copy.deepcopy(current_unit)
-
-        current_unit_copy.is_flipped = is_flipped[i]
-        current_unit_copy.is_in_battle_hex = is_battle_hex[i]
-        current_unit_copy.is_extended_range = is_extended[i]
-        current_unit_copy.attack_modifier = modifier[i]
-
-        unit_list.append(current_unit_copy)
-
-    total_cf = sum(map(lambda x: x.combat_factor(), unit_list))
-
-    cf = html.Div([
-        dbc.Label(f'Allied Forces', style={'font-weight': 'bold'}),
-        dbc.Label(f':  {total_cf} Combat Factors', color='red'),
-    ])
-
-    return cf
 
 
-@app.callback(
-    Output({'type': 'japan-image', 'index': MATCH}, 'src'),
-    Input({'type': 'japan-unit-flipped', 'index': MATCH}, 'value'),
-    State({'type': 'japan-unit-flipped', 'index': MATCH}, 'id'),
-)
-def toggle_japan_unit_flipped(value, id):
-    index = id.get('index')
-
-    selected_unit = next((x for x in japan_unit_list if x.unit_id == index), None)
-
-    if value:
-        src = f'assets/static/images/{selected_unit.image_name_back}'
-    else:
-        src = f'assets/static/images/{selected_unit.image_name_front}'
-
-    return src
-
-
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='eots', function_name='unit_cf'),
     Output({'type': 'japan-cf', 'index': MATCH}, 'children'),
     [Input({'type': 'japan-unit-flipped', 'index': MATCH}, 'value'),
      Input({'type': 'japan-unit-battle-hex', 'index': MATCH}, 'value'),
      Input({'type': 'japan-unit-extended', 'index': MATCH}, 'value'),
      Input({'type': 'japan-unit-mod', 'index': MATCH}, 'value')],
-    State({'type': 'japan-unit-flipped', 'index': MATCH}, 'id'),
+    [State({'type': 'japan-unit-flipped', 'index': MATCH}, 'id'),
+     State('unit-stats', 'data')]
 )
-def update_japan_unit_cf(is_flipped, is_battle_hex, is_extended, modifier, is_flipped_id):
-    index = is_flipped_id.get('index')
-
-    selected_unit = next((x for x in japan_unit_list if x.unit_id == index), None)
-    selected_unit_copy = copy.deepcopy(selected_unit)
-
-    selected_unit_copy.is_flipped = is_flipped
-    selected_unit_copy.is_in_battle_hex = is_battle_hex
-    selected_unit_copy.is_extended_range = is_extended
-    selected_unit_copy.attack_modifier = modifier
-
-    cf = dbc.Label(f'CF: {selected_unit_copy.combat_factor()}')
 
-    return cf
-
-
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='eots', function_name='japan_total_cf'),
     Output('japan-total-cf', 'children'),
-    [Input({'type': 'japan-unit-flipped', 'index': ALL}, 'value'),
-     Input({'type': 'japan-unit-battle-hex', 'index': ALL}, 'value'),
-     Input({'type': 'japan-unit-extended', 'index': ALL}, 'value'),
-     Input({'type': 'japan-unit-mod', 'index': ALL}, 'value'),
-     Input('japan-combat-force', 'data')]
+    Input('japan-force', 'data'),
+    State('unit-stats', 'data')
 )
-def update_japan_total_cf(is_flipped, is_battle_hex, is_extended, modifier, json_data):
-    index_list = json.loads(json_data)
-    unit_list = []
-
-    for i in range(len(index_list)):
-        index = index_list[i]
-        current_unit = next((x for x in japan_unit_list if x.unit_id == index), None)
-        current_unit_copy = copy.deepcopy(current_unit)
-
-        current_unit_copy.is_flipped = is_flipped[i]
-        current_unit_copy.is_in_battle_hex = is_battle_hex[i]
-        current_unit_copy.is_extended_range = is_extended[i]
-        current_unit_copy.attack_modifier = modifier[i]
-
-        unit_list.append(current_unit_copy)
-
-    total_cf = sum(map(lambda x: x.combat_factor(), unit_list))
-    cf = html.Div([
-        dbc.Label(f'Japan Forces', style={'font-weight': 'bold'}),
-        dbc.Label(f':  {total_cf} Combat Factors', color='red'),
-    ])
-
-    return cf
 
 
 @app.callback(
-    [Output('expected-winner', 'figure'), Output('expected-losses', 'figure')],
+    [Output('expected-winner-traces', 'data'), Output('expected-losses-traces', 'data')],
     [Input('analyze-battle', 'n_clicks'),
      Input('intel-condition', 'value'),
      Input('reaction-player', 'value'),
      Input('air-power-drm', 'value'),
      Input('allied-ec-mod', 'value'),
      Input('japan-ec-mod', 'value')],
-    [State({'type': 'allied-unit-flipped', 'index': ALL}, 'value'),
-     State({'type': 'allied-unit-battle-hex', 'index': ALL}, 'value'),
-     State({'type': 'allied-unit-extended', 'index': ALL}, 'value'),
-     State({'type': 'allied-unit-mod', 'index': ALL}, 'value'),
-     State('allied-combat-force', 'data'),
-     State({'type': 'japan-unit-flipped', 'index': ALL}, 'value'),
-     State({'type': 'japan-unit-battle-hex', 'index': ALL}, 'value'),
-     State({'type': 'japan-unit-extended', 'index': ALL}, 'value'),
-     State({'type': 'japan-unit-mod', 'index': ALL}, 'value'),
-     State('japan-combat-force', 'data')]
+    [State('allied-force', 'data'),
+     State('japan-force', 'data')]
 )
 def analyze_battle_results(n_clicks, intel_condition_value, reaction_player_value,
                            air_power_drm_value, allied_ec_mod_value, japan_ec_mod_value,
-                           allied_flipped, allied_battle_hex, allied_extended, allied_mod, allied_json,
-                           japan_flipped, japan_battle_hex, japan_extended, japan_mod, japan_json):
+                           allied_force_state, japan_force_state):
     if (not n_clicks):
         raise PreventUpdate
 
-    index_list = json.loads(allied_json)
+    allied_combat_force = build_combat_force(allied_force_state)
+    japan_combat_force = build_combat_force(japan_force_state)
+
+    if (len(allied_combat_force) == 0) | (len(japan_combat_force) == 0):
+        raise PreventUpdate
 
-    allied_combat_force = []
+    print(f'Intel Condition: {enums.IntelCondition(intel_condition_value).name}, '
+          f'Reaction Player: {enums.Player(reaction_player_value).name}')
+    print(f'Allied Force: {allied_combat_force.unit_id.tolist()}')
+    print(f'Japan Force: {japan_combat_force.unit_id.tolist()}')
+    print('============================')
 
-    for i in range(len(index_list)):
-        index = index_list[i]
-        current_unit = next((x for x in allied_unit_list if x.unit_id == index), None)
-        current_unit_copy = copy.deepcopy(current_unit)
+    analyzer = BattleAnalyzer(intel_condition=enums.IntelCondition(intel_condition_value),
+                              reaction_player=enums.Player(reaction_player_value),
+                              air_power_mod=enums.AirPowerModifier(air_power_drm_value),
+                              allied_ec_mod=allied_ec_mod_value,
+                              japan_ec_mod=japan_ec_mod_value)
 
-        current_unit_copy.is_flipped = allied_flipped[i]
-        current_unit_copy.is_in_battle_hex = allied_battle_hex[i]
-        current_unit_copy.is_extended_range = allied_extended[i]
-        current_unit_copy.attack_modifier = allied_mod[i]
+    scenario_key = analyzer.scenario_key(allied_combat_force, japan_combat_force)
+    traces = battle_results_cache.get(scenario_key)
 
-        allied_combat_force.append(current_unit_copy)
+    if traces is None:
+        battle_summary = analyzer.summarize_battle(allied_combat_force, japan_combat_force)
 
-    index_list = json.loads(japan_json)
+        traces = [plots.expected_winner_traces(battle_summary), plots.expected_losses_traces(battle_summary)]
+        battle_results_cache.put(scenario_key, traces)
 
-    japan_combat_force = []
+    return traces
 
-    for i in range(len(index_list)):
-        index = index_list[i]
-        current_unit = next((x for x in japan_unit_list if x.unit_id == index), None)
-        current_unit_copy = copy.deepcopy(current_unit)
 
-        current_unit_copy.is_flipped = japan_flipped[i]
-        current_unit_copy.is_in_battle_hex = japan_battle_hex[i]
-        current_unit_copy.is_extended_range = japan_extended[i]
-        current_unit_copy.attack_modifier = japan_mod[i]
+@app.callback(
+    Output('modifier-sweep-traces', 'data'),
+    Input('sweep-battle', 'n_clicks'),
+    [State('allied-force', 'data'),
+     State('japan-force', 'data')]
+)
+def sweep_battle_results(n_clicks, allied_force_state, japan_force_state):
+    if not n_clicks:
+        raise PreventUpdate
 
-        japan_combat_force.append(current_unit_copy)
+    allied_combat_force = build_combat_force(allied_force_state)
+    japan_combat_force = build_combat_force(japan_force_state)
 
     if (len(allied_combat_force) == 0) | (len(japan_combat_force) == 0):
         raise PreventUpdate
 
-    print(f'Intel Condition: {enums.IntelCondition(intel_condition_value).name}, '
-          f'Reaction Player: {enums.Player(reaction_player_value).name}')
-    print(f'Allied Force: {allied_json}')
-    print(f'Japan Force: {japan_json}')
-    print('============================')
+    scenario_key = ('sweep', allied_combat_force.signature(), japan_combat_force.signature())
+    traces = battle_results_cache.get(scenario_key)
 
-    analyzer = BattleAnalyzer(intel_condition=enums.IntelCondition(intel_condition_value),
-                              reaction_player=enums.Player(reaction_player_value),
-                              air_power_mod=enums.AirPowerModifier(air_power_drm_value),
-                              allied_ec_mod=allied_ec_mod_value,
-                              japan_ec_mod=japan_ec_mod_value)
+    if traces is None:
+        results = BattleAnalyzer.sweep(allied_combat_force, japan_combat_force)
 
-    results = analyzer.analyze_battle(allied_combat_force, japan_combat_force)
+        traces = plots.modifier_sweep_traces(results)
+        battle_results_cache.put(scenario_key, traces)
+
+    return traces
+
+
+def analyze_cards(user_name, pw, game_name, deck_type, allied_hand_size, japan_hand_size):
+    # Runs as a background job, so the remote ACTS pages don't hold up a web worker
+    from card_analyzer import load_card_analyzer
+
+    analyzer = load_card_analyzer()
+
+    print(f'Deck Type: {enums.DeckType(deck_type).name}, '
+          f'Allied Hand Size: {allied_hand_size}, Japan Hand Size: {japan_hand_size}')
+    print('======================================')
 
-    winner = plot_expected_winner(results)
-    losses = plot_expected_losses(results)
+    results = analyzer.analyze_card_deck(user_name=user_name, pw=pw, game_name=game_name, deck_type=deck_type,
+                                         allies_draw_count=allied_hand_size, japan_draw_count=japan_hand_size)
 
-    return [winner, losses]
+    return [plots.card_analysis_traces(results[0]), plots.card_analysis_traces(results[1])]
 
 
 @app.callback(
-    [Output('allied-probability', 'figure'), Output('japan-probability', 'figure')],
-    Input('analyze-cards', 'n_clicks'),
+    [Output('card-job', 'data'), Output('allied-probability-traces', 'data'),
+     Output('japan-probability-traces', 'data'), Output('card-job-poll', 'disabled'),
+     Output('card-job-status', 'children')],
+    [Input('analyze-cards', 'n_clicks'), Input('card-job-poll', 'n_intervals')],
     [State('acts-username', 'value'), State('acts-password', 'value'), State('acts-game-name', 'value'),
-     State('allied-hand-size', 'value'), State('japan-hand-size', 'value'), State('card-deck-type', 'value')]
+     State('allied-hand-size', 'value'), State('japan-hand-size', 'value'), State('card-deck-type', 'value'),
+     State('card-job', 'data')]
 )
-def analyze_cards(n_clicks, acts_username_value, acts_password_value, acts_game_name_value,
-                  allied_hand_size_value, japan_hand_size_value, card_deck_type_value):
-    if (not acts_username_value) | (not acts_password_value) | (not acts_game_name_value) | (not n_clicks):
+def card_analysis_job(n_clicks, n_intervals, acts_username_value, acts_password_value, acts_game_name_value,
+                      allied_hand_size_value, japan_hand_size_value, card_deck_type_value, job_data):
+    # Clicking Analyze Cards submits a job, and each tick of the poll interval checks on it. Dash 2.1 allows an output
+    # in only one callback, so both are handled here.
+    from card_jobs import load_job_queue
+
+    job_queue = load_job_queue()
+    triggered = [x['prop_id'] for x in dash.callback_context.triggered]
+
+    if 'analyze-cards.n_clicks' in triggered:
+        if (not acts_username_value) | (not acts_password_value) | (not acts_game_name_value) | (not n_clicks):
+            raise PreventUpdate
+
+        job_id = job_queue.submit(analyze_cards, acts_username_value, acts_password_value, acts_game_name_value,
+                                  card_deck_type_value, allied_hand_size_value, japan_hand_size_value)
+
+        return {'job_id': job_id}, dash.no_update, dash.no_update, False, 'Retrieving the discards from ACTS...'
+
+    if (not n_intervals) | (not job_data):
         raise PreventUpdate
 
-    analyzer = CardAnalyzer()
+    job = job_queue.status(job_data['job_id'])
 
-    print(f'Deck Type: {enums.DeckType(card_deck_type_value).name}, '
-          f'Allied Hand Size: {allied_hand_size_value}, Japan Hand Size: {japan_hand_size_value}')
-    print('======================================')
+    if job['status'] in ['pending', 'running']:
+        raise PreventUpdate
+
+    job_queue.pop(job_data['job_id'])
+
+    if job['status'] == 'done':
+        return None, job['result'][0], job['result'][1], True, ''
 
-    results = analyzer.analyze_card_deck(user_name=acts_username_value, pw=acts_password_value,
-                                         game_name=acts_game_name_value, deck_type=card_deck_type_value,
-                                         allies_draw_count=allied_hand_size_value,
-                                         japan_draw_count=japan_hand_size_value)
+    if job['status'] == 'failed':
+        return None, dash.no_update, dash.no_update, True, f'Card analysis failed: {job["error"]}'
 
-    allied_plot = plot_card_analysis(df_results=results[0], player=enums.Player.ALLIES)
-    japan_plot = plot_card_analysis(df_results=results[1], player=enums.Player.JAPAN)
+    return None, dash.no_update, dash.no_update, True, 'The card analysis job was lost, please analyze the cards again'
 
-    return [allied_plot, japan_plot]
+
+# The trace arrays are merged into the figure in the browser, see assets/figures.js
+for graph_id in figures:
+    app.clientside_callback(
+        ClientsideFunction(namespace='eots', function_name='update_figure'),
+        Output(graph_id, 'figure'),
+        Input(f'{graph_id}-traces', 'data'),
+        State(graph_id, 'figure')
+    )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,90 @@
+// Combat Factor rules of CombatUnit.combat_factor and CombatForce.combat_factor, evaluated in the browser from the
+// unit stats table, so the CF labels update without a round trip to the server.
+// A unit's stats are [attack_front, attack_back, is_naval], with a null attack_back when the unit has no back side.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.eots = Object.assign({}, window.dash_clientside.eots, {
+    combat_factor: function (stats, isFlipped, isBattleHex, isExtended, modifier) {
+        // NaN wherever the server version raises, so the label keeps its previous value
+        if ((stats === undefined) || (modifier === null) || (modifier === undefined) || (modifier === '')) {
+            return NaN;
+        }
+
+        // A missing back side stays NaN unless the unit is zeroed for being outside the battle hex
+        let combatFactor = isFlipped ? stats[1] : stats[0];
+
+        combatFactor = (combatFactor === null ? NaN : combatFactor) + Number(modifier);
+
+        if (isExtended) {
+            combatFactor = Math.ceil(combatFactor / 2);
+        }
+
+        if (stats[2] && !isBattleHex) {
+            combatFactor = 0;
+        }
+
+        return Math.ceil(combatFactor);
+    },
+
+    force_combat_factor: function (forceState, unitStats) {
+        // forceState is the per side store kept by eots.force_state, see assets/force_state.js
+        if (!forceState) {
+            return NaN;
+        }
+
+        let totalCombatFactor = 0;
+
+        for (let i = 0; i < forceState.unit_ids.length; i++) {
+            // CombatForce holds the EC modifiers as integers
+            const modifier = forceState.attack_modifier[i];
+            const unitModifier = (modifier === null) || (modifier === undefined) || (modifier === '') ?
+                null : Math.trunc(Number(modifier));
+
+            totalCombatFactor += window.dash_clientside.eots.combat_factor(
+                unitStats[forceState.unit_ids[i]], forceState.is_flipped[i], forceState.is_in_battle_hex[i],
+                forceState.is_extended_range[i], unitModifier);
+        }
+
+        return totalCombatFactor;
+    },
+
+    unit_cf: function (isFlipped, isBattleHex, isExtended, modifier, id, unitStats) {
+        const stats = unitStats[id.index];
+        const combatFactor = window.dash_clientside.eots.combat_factor(
+            stats, isFlipped, isBattleHex, isExtended, modifier);
+
+        // CombatUnit.combat_factor also raises when a missing back side is halved for extended range
+        if (isNaN(combatFactor) || (isFlipped && isExtended && (stats[1] === null))) {
+            return window.dash_clientside.no_update;
+        }
+
+        return {namespace: 'dash_bootstrap_components', type: 'Label', props: {children: `CF: ${combatFactor}`}};
+    },
+
+    total_cf: function (playerName, forceState, unitStats) {
+        const totalCombatFactor = window.dash_clientside.eots.force_combat_factor(forceState, unitStats);
+
+        if (isNaN(totalCombatFactor)) {
+            return window.dash_clientside.no_update;
+        }
+
+        return {
+            namespace: 'dash_html_components', type: 'Div', props: {
+                children: [
+                    {namespace: 'dash_bootstrap_components', type: 'Label',
+                        props: {children: `${playerName} Forces`, style: {'font-weight': 'bold'}}},
+                    {namespace: 'dash_bootstrap_components', type: 'Label',
+                        props: {children: `:  ${totalCombatFactor} Combat Factors`, color: 'red'}}
+                ]
+            }
+        };
+    },
+
+    allied_total_cf: function (forceState, unitStats) {
+        return window.dash_clientside.eots.total_cf('Allied', forceState, unitStats);
+    },
+
+    japan_total_cf: function (forceState, unitStats) {
+        return window.dash_clientside.eots.total_cf('Japan', forceState, unitStats);
+    }
+});
@@ -0,0 +1,13 @@
+// Figure updates: the static layout and trace styles of each figure come with the page layout, and the callbacks only
+// send the trace arrays, which are merged into the figure here. The server side version is plots.merge_traces.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.eots = Object.assign({}, window.dash_clientside.eots, {
+    update_figure: function (traces, figure) {
+        if (!traces) {
+            return window.dash_clientside.no_update;
+        }
+
+        return {data: figure.data.map((x, i) => Object.assign({}, x, traces[i])), layout: figure.layout};
+    }
+});
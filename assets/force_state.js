@@ -0,0 +1,118 @@
+// Unit cards and per side force state, kept in the browser so adding or removing a unit doesn't send the whole force
+// to the server and back. The server side reference for the cards is unit_card in app.py.
+// A unit's card info is [image_name_front, image_name_back, has_extended_range, is_in_battle_hex], and the unit images
+// are shown from the sprite atlas built by sprite_atlas.py.
+// Each asset file merges its functions into eots, so the files can be loaded in any order.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.eots = Object.assign({}, window.dash_clientside.eots, {
+    component: function (namespace, type, props) {
+        return {namespace: namespace, type: type, props: props};
+    },
+
+    sprite_style: function (imageName, unitSprites) {
+        // The server side reference is sprite_atlas.sprite_style
+        const position = unitSprites.images[imageName];
+
+        if (position === undefined) {
+            return {backgroundImage: `url(assets/static/images/${imageName})`, display: 'inline-block',
+                width: '65px', height: '65px'};
+        }
+
+        return {backgroundImage: `url(${unitSprites.url})`, backgroundPosition: `-${position[0]}px -${position[1]}px`,
+            display: 'inline-block', width: `${position[2]}px`, height: `${position[3]}px`};
+    },
+
+    unit_image: function (isFlipped, id, unitCards, unitSprites) {
+        // Flipping a unit only moves the atlas to its back side, the atlas is already loaded
+        const card = unitCards[id.index];
+
+        return window.dash_clientside.eots.sprite_style(isFlipped ? card[1] : card[0], unitSprites);
+    },
+
+    unit_card: function (playerPrefix, unitId, unitStats, unitCards, unitSprites) {
+        const eots = window.dash_clientside.eots;
+        const html = (type, props) => eots.component('dash_html_components', type, props);
+        const dbc = (type, props) => eots.component('dash_bootstrap_components', type, props);
+        const cardId = (type) => ({type: `${playerPrefix}-${type}`, index: unitId});
+
+        const card = unitCards[unitId];
+        const combatFactor = eots.combat_factor(unitStats[unitId], false, Boolean(card[3]), false, 0);
+
+        return html('Div', {
+            children: [
+                dbc('Row', {
+                    children: [
+                        dbc('Col', {
+                            children: html('Div', {
+                                children: [
+                                    html('Div', {children: null, id: cardId('image'),
+                                        style: eots.sprite_style(card[0], unitSprites)}),
+                                    html('P', {children: null}),
+                                    html('Div', {
+                                        children: [dbc('Label', {children: `CF: ${combatFactor}`})],
+                                        id: cardId('cf')
+                                    })
+                                ]
+                            }),
+                            width: 4
+                        }),
+                        dbc('Col', {
+                            children: html('Div', {
+                                children: [
+                                    dbc('Checkbox', {id: cardId('unit-flipped'), label: 'Flipped?', value: false}),
+                                    dbc('Checkbox', {id: cardId('unit-extended'), label: 'Extended Range?',
+                                        value: false, disabled: !card[2]}),
+                                    dbc('Checkbox', {id: cardId('unit-battle-hex'), label: 'In Battle Hex?',
+                                        value: Boolean(card[3])}),
+                                    html('P', {children: 'EC Modifier:', className: 'm-0'}),
+                                    dbc('Input', {id: cardId('unit-mod'), type: 'number', min: -2, max: 2, step: 1,
+                                        value: 0})
+                                ]
+                            }),
+                            width: 8
+                        })
+                    ]
+                })
+            ],
+            className: 'p-1 m-1 bg-light border rounded-3 border-primary',
+            id: cardId('combat-unit')
+        });
+    },
+
+    unit_cards: function (playerPrefix, selectedUnitIds, children, unitStats, unitCards, unitSprites) {
+        // Cards of units still selected are kept as they are, and a card is added for each newly selected unit
+        const selected = new Set(selectedUnitIds || []);
+        const cards = (children || []).filter(x => selected.has(x.props.id.index));
+        const cardIds = new Set(cards.map(x => x.props.id.index));
+        const addedIds = Array.from(selected).filter(x => !cardIds.has(x) && (unitCards[x] !== undefined));
+
+        if ((addedIds.length === 0) && (cards.length === (children || []).length)) {
+            return window.dash_clientside.no_update;
+        }
+
+        return cards.concat(addedIds.map(x => window.dash_clientside.eots.unit_card(playerPrefix, x, unitStats,
+            unitCards, unitSprites)));
+    },
+
+    allied_unit_cards: function (selectedUnitIds, children, unitStats, unitCards, unitSprites) {
+        return window.dash_clientside.eots.unit_cards('allied', selectedUnitIds, children, unitStats, unitCards,
+            unitSprites);
+    },
+
+    japan_unit_cards: function (selectedUnitIds, children, unitStats, unitCards, unitSprites) {
+        return window.dash_clientside.eots.unit_cards('japan', selectedUnitIds, children, unitStats, unitCards,
+            unitSprites);
+    },
+
+    force_state: function (isFlipped, isBattleHex, isExtended, modifier, ids) {
+        // The selected units and the state of each one, in the order of their cards
+        return {
+            unit_ids: ids.map(x => x.index),
+            is_flipped: isFlipped,
+            is_in_battle_hex: isBattleHex,
+            is_extended_range: isExtended,
+            attack_modifier: modifier
+        };
+    }
+});
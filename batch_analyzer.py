@@ -0,0 +1,190 @@
+import argparse
+import math
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import enums
+from combat_force import CombatForce
+from battle_analyzer import BattleAnalyzer
+from batch_engine import SUMMARY_COLUMNS, summarize_battles
+from unit_registry import load_registry
+
+
+# The per unit list columns of each side, e.g. allied_unit_ids
+LIST_COLUMNS = [f'{prefix}_{column}' for prefix in ['allied', 'japan']
+                for column in ['unit_ids', 'flipped', 'battle_hex', 'extended', 'mod']]
+
+
+def init_worker():
+    # Build the unit registry once per worker process, rather than once per scenario
+    load_registry()
+
+
+def load_scenarios(file_name: str):
+    if file_name.endswith('.parquet'):
+        return pd.read_parquet(file_name)
+
+    # A list with a single value would otherwise be read as a number
+    return pd.read_csv(file_name, dtype={x: str for x in LIST_COLUMNS})
+
+
+def is_missing(value):
+    # Empty cells are read as NaN
+    return (value is None) or (isinstance(value, float) and math.isnan(value))
+
+
+def scenario_value(scenario: dict, column: str, default):
+    value = scenario.get(column)
+
+    return default if is_missing(value) else value
+
+
+def parse_list(value, cast, default=None):
+    # Lists are stored as ';' separated strings in CSV files, and as native lists in Parquet files
+    if is_missing(value):
+        return default
+
+    if isinstance(value, str):
+        return [cast(x) for x in value.split(';') if x != '']
+
+    if not hasattr(value, '__iter__'):
+        return [cast(value)]
+
+    return [cast(x) for x in value]
+
+
+def parse_flag(value):
+    return str(value).strip().lower() in ['1', 'true', 'y', 'yes']
+
+
+def build_scenario_force(scenario: dict, prefix: str):
+    unit_registry = load_registry()
+    unit_ids = parse_list(scenario.get(f'{prefix}_unit_ids'), int, default=[])
+
+    if len(unit_ids) == 0:
+        raise ValueError(f'Scenario {scenario.get("scenario_id")}: the {prefix} side has no units')
+
+    for unit_id in unit_ids:
+        if unit_id not in unit_registry:
+            raise ValueError(f'Scenario {scenario.get("scenario_id")}: unknown unit id {unit_id}')
+
+        # Only Air and Naval units fight in a battle
+        if unit_registry.get(unit_id).unit_type == enums.UnitType.GROUND:
+            raise ValueError(f'Scenario {scenario.get("scenario_id")}: unit id {unit_id} is a Ground unit')
+
+    unit_state = {
+        'is_flipped': parse_list(scenario.get(f'{prefix}_flipped'), parse_flag),
+        'is_in_battle_hex': parse_list(scenario.get(f'{prefix}_battle_hex'), parse_flag),
+        'is_extended_range': parse_list(scenario.get(f'{prefix}_extended'), parse_flag),
+        'attack_modifier': parse_list(scenario.get(f'{prefix}_mod'), int)
+    }
+
+    # A missing column takes the unit defaults, but a given list needs one value per unit
+    for column, values in zip(['flipped', 'battle_hex', 'extended', 'mod'], unit_state.values()):
+        if (values is not None) and (len(values) != len(unit_ids)):
+            raise ValueError(f'Scenario {scenario.get("scenario_id")}: {prefix}_{column} has {len(values)} values '
+                             f'for {len(unit_ids)} units')
+
+    return CombatForce(unit_registry.get_units(unit_ids), **unit_state)
+
+
+def build_scenario(scenario: dict):
+    allied_force = build_scenario_force(scenario, 'allied')
+    japan_force = build_scenario_force(scenario, 'japan')
+
+    analyzer = BattleAnalyzer(intel_condition=enums.IntelCondition[scenario_value(scenario, 'intel_condition',
+                                                                                  'INTERCEPT')],
+                              reaction_player=enums.Player[scenario_value(scenario, 'reaction_player', 'ALLIES')],
+                              air_power_mod=enums.AirPowerModifier(int(scenario_value(scenario, 'air_power_mod', 0))),
+                              allied_ec_mod=int(scenario_value(scenario, 'allied_ec_mod', 0)),
+                              japan_ec_mod=int(scenario_value(scenario, 'japan_ec_mod', 0)))
+
+    return allied_force, japan_force, analyzer
+
+
+def scenario_error(e: Exception):
+    return f'{type(e).__name__}: {e}'
+
+
+def analyze_scenario_chunk(scenarios: [dict]):
+    # A scenario that can't be built or summarized is reported in the error column, rather than failing the file
+    results = [dict({'scenario_id': x.get('scenario_id')}, **{column: math.nan for column in SUMMARY_COLUMNS},
+                    error='') for x in scenarios]
+    built = {}
+
+    for i, scenario in enumerate(scenarios):
+        try:
+            built[i] = build_scenario(scenario)
+        except Exception as e:
+            results[i]['error'] = scenario_error(e)
+
+    # The whole chunk is resolved at once by the batched engine, and one scenario at a time if any of them fails
+    try:
+        summarized = [(list(built), summarize_battles(list(built.values())))]
+    except Exception:
+        summarized = []
+
+        for i, scenario in built.items():
+            try:
+                summarized.append(([i], summarize_battles([scenario])))
+            except Exception as e:
+                results[i]['error'] = scenario_error(e)
+
+    for index, summaries in summarized:
+        for j, i in enumerate(index):
+            results[i].update({column: summaries[column][j].item() for column in SUMMARY_COLUMNS})
+
+    return results
+
+
+def write_results(results: pd.DataFrame, output_file: str, writer, first_chunk: bool):
+    if output_file.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(results, preserve_index=False)
+
+        if writer is None:
+            writer = pq.ParquetWriter(output_file, table.schema)
+
+        writer.write_table(table)
+    else:
+        results.to_csv(output_file, mode='w' if first_chunk else 'a', header=first_chunk, index=False)
+
+    return writer
+
+
+def analyze_scenario_file(input_file: str, output_file: str, max_workers: int = None, chunk_size: int = 100):
+    scenarios = load_scenarios(input_file)
+
+    if 'scenario_id' not in scenarios.columns:
+        scenarios['scenario_id'] = scenarios.index
+
+    records = scenarios.to_dict(orient='records')
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+
+    writer = None
+    scenario_count = 0
+
+    # Results are written as each chunk completes, in the order of the scenario file
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as executor:
+        for i, chunk_results in enumerate(executor.map(analyze_scenario_chunk, chunks)):
+            writer = write_results(pd.DataFrame(data=chunk_results), output_file, writer, first_chunk=(i == 0))
+            scenario_count += len(chunk_results)
+
+    if writer is not None:
+        writer.close()
+
+    return scenario_count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze a file of battle scenarios')
+    parser.add_argument('input_file', help='CSV or Parquet file of scenarios')
+    parser.add_argument('output_file', help='CSV or Parquet file to write the results to')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=100, help='Number of scenarios per worker task')
+    args = parser.parse_args()
+
+    count = analyze_scenario_file(args.input_file, args.output_file, max_workers=args.workers,
+                                  chunk_size=args.chunk_size)
+    print(f'Analyzed {count} scenarios')
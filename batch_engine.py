@@ -0,0 +1,307 @@
+import numpy as np
+import enums
+from combat_force import CombatForce, as_combat_force
+from battle_analyzer import DICE_VALUES
+
+# The loss result bands of a die roll, and the outcome classes of a single die: (band, critical hit) pairs, with the
+# band varying slowest
+RESULT_BANDS = np.array([0.25, 0.50, 1.00])
+DIE_CLASS_BAND = np.repeat(RESULT_BANDS, 2)
+DIE_CLASS_CRITICAL = np.tile([False, True], len(RESULT_BANDS))
+DIE_CLASS_COUNT = len(DIE_CLASS_BAND)
+
+# The largest number of scenarios resolved in one padded batch, which bounds the size of the outcome class arrays
+BATCH_SIZE = 1024
+
+SUMMARY_PLAYERS = [(enums.Player.ALLIES, 'allied'), (enums.Player.JAPAN, 'japan')]
+SUMMARY_COLUMNS = [f'{prefix}_{column}' for player, prefix in SUMMARY_PLAYERS
+                   for column in ['win_probability', 'expected_damage_applied', 'expected_remaining_cf',
+                                  'remaining_cf_variance']]
+
+
+def die_class_counts(drm):
+    # The number of die values in each die outcome class, for every scenario's die roll modifier
+    modified_rolls = DICE_VALUES[None, :] + np.asarray(drm)[:, None]
+    band = np.where(modified_rolls <= 2, 0, np.where(modified_rolls <= 5, 1, 2))
+    die_class = band * 2 + (DICE_VALUES[None, :] == 9)
+
+    counts = np.zeros((len(modified_rolls), DIE_CLASS_COUNT), dtype=int)
+    np.add.at(counts, (np.repeat(np.arange(len(modified_rolls)), len(DICE_VALUES)), die_class.ravel()), 1)
+
+    return counts
+
+
+class PaddedForces:
+
+    def __init__(self, forces: [CombatForce]):
+        # One row per scenario, with the units of each force in damage allocation order and padded to the size of the
+        # largest force
+        unit_count = max(len(x) for x in forces)
+
+        def padded(values, fill, dtype):
+            array = np.full((len(forces), unit_count), fill, dtype=dtype)
+
+            for row, (force, force_values) in enumerate(zip(forces, values)):
+                array[row, :len(force)] = np.asarray(force_values)[force.damage_order]
+
+            return array
+
+        self.valid = padded([np.ones(len(x), dtype=bool) for x in forces], False, bool)
+        self.attack_front = padded([x.attack_front for x in forces], 0.0, float)
+        self.attack_back = padded([x.attack_back for x in forces], 0.0, float)
+        self.defense = padded([x.defense for x in forces], 0, int)
+        self.is_flipped = padded([x.is_flipped for x in forces], False, bool)
+        self.is_in_battle_hex = padded([x.is_in_battle_hex for x in forces], False, bool)
+        self.is_extended_range = padded([x.is_extended_range for x in forces], False, bool)
+        self.attack_modifier = padded([x.attack_modifier for x in forces], 0, int)
+        self.is_air_unit = padded([x.is_air_unit for x in forces], False, bool)
+        self.is_naval_unit = padded([np.isnan(x.move_range) for x in forces], False, bool)
+
+        self.air_unit_count = self.is_air_unit.sum(axis=1)
+
+    def combat_factor(self, scenarios, damage_flipped, damage_eliminated):
+        # The rules of CombatForce.combat_factor, for the forces of the given scenarios with the given damage
+        combat_factor = np.where(self.is_flipped[scenarios] | damage_flipped, self.attack_back[scenarios],
+                                 self.attack_front[scenarios])
+
+        combat_factor = combat_factor + self.attack_modifier[scenarios]
+
+        combat_factor = np.where(self.is_extended_range[scenarios], np.ceil(combat_factor / 2), combat_factor)
+
+        combat_factor[damage_eliminated | (self.is_naval_unit[scenarios] & ~self.is_in_battle_hex[scenarios]) |
+                      ~self.valid[scenarios]] = 0
+
+        return np.ceil(combat_factor).sum(axis=1).astype(int)
+
+    def allocate_damage(self, scenarios, total_losses, critical_hit, opponent_air_unit_count):
+        # The greedy damage allocation of apply_damage, run for every row at once: each step selects the next unit to
+        # damage in every row still taking losses
+        row_count, unit_count = len(scenarios), self.valid.shape[1]
+        rows = np.arange(row_count)
+
+        valid = self.valid[scenarios]
+        defense = self.defense[scenarios]
+        is_air_unit = self.is_air_unit[scenarios]
+        is_flipped = self.is_flipped[scenarios]
+
+        damage_flipped = np.zeros((row_count, unit_count), dtype=bool)
+        damage_eliminated = np.zeros((row_count, unit_count), dtype=bool)
+
+        damage_applied = np.zeros(row_count, dtype=int)
+        air_units_damaged = np.zeros(row_count, dtype=int)
+        unflipped_unit_count = (valid & ~is_flipped).sum(axis=1)
+
+        active = damage_applied < total_losses
+
+        while active.any():
+            damage_to_apply = total_losses - damage_applied
+
+            candidates = valid & ~damage_eliminated & (defense <= damage_to_apply[:, None]) & active[:, None]
+
+            skip_undamaged_air = (air_units_damaged == opponent_air_unit_count)[:, None]
+            candidates &= ~(is_air_unit & skip_undamaged_air & ~damage_flipped)
+
+            skip_flipped = (damage_flipped | is_flipped) & (unflipped_unit_count > 0)[:, None]
+            candidates &= ~skip_flipped | critical_hit[:, None]
+
+            selected = candidates.any(axis=1)
+            active &= selected
+
+            hit_rows = rows[selected]
+            hit_units = candidates[selected].argmax(axis=1)
+
+            damage_applied[hit_rows] += defense[hit_rows, hit_units]
+            air_units_damaged[hit_rows] += is_air_unit[hit_rows, hit_units] & \
+                ~damage_flipped[hit_rows, hit_units] & ~damage_eliminated[hit_rows, hit_units]
+
+            eliminate = is_flipped[hit_rows, hit_units] | damage_flipped[hit_rows, hit_units]
+            damage_eliminated[hit_rows[eliminate], hit_units[eliminate]] = True
+            damage_flipped[hit_rows[~eliminate], hit_units[~eliminate]] = True
+            unflipped_unit_count[hit_rows[~eliminate]] -= 1
+
+            active &= damage_applied < total_losses
+
+        # A critical hit that damaged no unit falls on the first unit in damage allocation order
+        fallback = (damage_applied == 0) & critical_hit
+        damage_eliminated[fallback, 0] |= is_flipped[fallback, 0]
+        damage_flipped[fallback, 0] |= ~is_flipped[fallback, 0]
+
+        return damage_flipped, damage_eliminated
+
+    def damage_applied(self, scenarios, damage_flipped, damage_eliminated):
+        defense = self.defense[scenarios]
+
+        return (defense * damage_flipped + defense * damage_eliminated).sum(axis=1)
+
+    def surviving_counts(self, scenarios, damage_eliminated):
+        surviving = self.valid[scenarios] & ~damage_eliminated
+
+        return surviving.sum(axis=1), (surviving & self.is_air_unit[scenarios]).sum(axis=1)
+
+
+def needs_fallback(allied_force: CombatForce, japan_force: CombatForce):
+    # Forces the padded engine doesn't cover: an empty side, or units without a back side, whose CF is undefined once
+    # they are flipped
+    return (len(allied_force) == 0) | (len(japan_force) == 0) | bool(np.isnan(allied_force.attack_back).any()) | \
+        bool(np.isnan(japan_force.attack_back).any())
+
+
+def summary_columns(summary):
+    result = {}
+
+    for player, prefix in SUMMARY_PLAYERS:
+        result[f'{prefix}_win_probability'] = summary.win_probability(player)
+        result[f'{prefix}_expected_damage_applied'] = summary.expected_damage_applied(player)
+        result[f'{prefix}_expected_remaining_cf'] = summary.expected_remaining_cf(player)
+        result[f'{prefix}_remaining_cf_variance'] = summary.remaining_cf_variance(player)
+
+    return result
+
+
+def summarize_battles(scenarios: list):
+    # Summarizes many battles at once. Each scenario is (allied forces, japan forces, BattleAnalyzer), and the
+    # result holds one array per summary column, with one value per scenario.
+    scenarios = [(as_combat_force(allied), as_combat_force(japan), analyzer) for allied, japan, analyzer in scenarios]
+
+    results = {column: np.zeros(len(scenarios)) for column in SUMMARY_COLUMNS}
+
+    fallback = np.array([needs_fallback(allied, japan) for allied, japan, analyzer in scenarios], dtype=bool)
+
+    # Scenarios the padded engine doesn't cover are summarized one at a time
+    for i in np.flatnonzero(fallback).tolist():
+        allied_force, japan_force, analyzer = scenarios[i]
+
+        for column, value in summary_columns(analyzer.summarize_battle(allied_force, japan_force)).items():
+            results[column][i] = value
+
+    # Scenarios of similar size are batched together, so little of each batch is padding
+    padded_index = np.flatnonzero(~fallback)
+    force_size = np.array([max(len(scenarios[i][0]), len(scenarios[i][1])) for i in padded_index.tolist()], dtype=int)
+    padded_index = padded_index[np.argsort(force_size, kind='stable')]
+
+    for start in range(0, len(padded_index), BATCH_SIZE):
+        batch_index = padded_index[start:start + BATCH_SIZE]
+        batch_results = summarize_padded([scenarios[i] for i in batch_index.tolist()])
+
+        for column in SUMMARY_COLUMNS:
+            results[column][batch_index] = batch_results[column]
+
+    return results
+
+
+def summarize_padded(scenarios: list):
+    scenario_count = len(scenarios)
+
+    allied = PaddedForces([x[0] for x in scenarios])
+    japan = PaddedForces([x[1] for x in scenarios])
+    analyzers = [x[2] for x in scenarios]
+
+    no_damage_allied = np.zeros(allied.valid.shape, dtype=bool)
+    no_damage_japan = np.zeros(japan.valid.shape, dtype=bool)
+
+    all_scenarios = np.arange(scenario_count)
+    allied_forces_cf = allied.combat_factor(all_scenarios, no_damage_allied, no_damage_allied)
+    japan_forces_cf = japan.combat_factor(all_scenarios, no_damage_japan, no_damage_japan)
+
+    # An Allied die class sets Japan's losses and whether Japan takes a critical hit, and a Japan die class sets the
+    # Allied losses and critical hit
+    allied_die_counts = die_class_counts([x.die_roll_modifier(enums.Player.ALLIES) for x in analyzers])
+    japan_die_counts = die_class_counts([x.die_roll_modifier(enums.Player.JAPAN) for x in analyzers])
+
+    surprise = np.array([(x.intel_condition == enums.IntelCondition.SURPRISE) &
+                         (x.reaction_player == enums.Player.ALLIES) for x in analyzers])
+    ambush = np.array([x.intel_condition == enums.IntelCondition.AMBUSH for x in analyzers]) & ~surprise
+    reaction_allies = np.array([x.reaction_player == enums.Player.ALLIES for x in analyzers])
+
+    # First allocation: one row per scenario and opposing die class
+    rows = np.repeat(all_scenarios, DIE_CLASS_COUNT)
+    die_class = np.tile(np.arange(DIE_CLASS_COUNT), scenario_count)
+
+    allied_losses = np.ceil(japan_forces_cf[rows] * DIE_CLASS_BAND[die_class]).astype(int)
+    allied_state = allied.allocate_damage(rows, allied_losses, DIE_CLASS_CRITICAL[die_class],
+                                          japan.air_unit_count[rows])
+
+    japan_losses = np.ceil(allied_forces_cf[rows] * DIE_CLASS_BAND[die_class]).astype(int)
+    japan_state = japan.allocate_damage(rows, japan_losses, DIE_CLASS_CRITICAL[die_class],
+                                        allied.air_unit_count[rows])
+
+    # Every outcome class: (scenario, Allied die class, Japan die class), with the Japan die class varying fastest
+    class_scenario = np.repeat(all_scenarios, DIE_CLASS_COUNT * DIE_CLASS_COUNT)
+    class_allied_die = np.tile(np.repeat(np.arange(DIE_CLASS_COUNT), DIE_CLASS_COUNT), scenario_count)
+    class_japan_die = np.tile(np.arange(DIE_CLASS_COUNT), scenario_count * DIE_CLASS_COUNT)
+
+    # The Allied damage depends on the Japan die, and the Japan damage on the Allied die
+    allied_row = class_scenario * DIE_CLASS_COUNT + class_japan_die
+    japan_row = class_scenario * DIE_CLASS_COUNT + class_allied_die
+
+    allied_flipped, allied_eliminated = allied_state[0][allied_row], allied_state[1][allied_row]
+    japan_flipped, japan_eliminated = japan_state[0][japan_row], japan_state[1][japan_row]
+
+    allied_remaining_cf = allied.combat_factor(class_scenario, allied_flipped, allied_eliminated)
+    japan_remaining_cf = japan.combat_factor(class_scenario, japan_flipped, japan_eliminated)
+
+    # Surprise with the Allies reacting: Japan's losses are recalculated from the remaining Allied forces
+    recalculate = np.flatnonzero(surprise[class_scenario])
+
+    if len(recalculate) > 0:
+        scenario = class_scenario[recalculate]
+        surviving_air = allied.surviving_counts(scenario, allied_eliminated[recalculate])[1]
+        losses = np.ceil(allied_remaining_cf[recalculate] * DIE_CLASS_BAND[class_allied_die[recalculate]]).astype(int)
+
+        flipped, eliminated = japan.allocate_damage(scenario, losses, DIE_CLASS_CRITICAL[class_allied_die[recalculate]],
+                                                    surviving_air)
+        japan_flipped[recalculate], japan_eliminated[recalculate] = flipped, eliminated
+        japan_remaining_cf[recalculate] = japan.combat_factor(scenario, flipped, eliminated)
+
+    # Ambush: the Allied losses are recalculated from the remaining Japan forces
+    recalculate = np.flatnonzero(ambush[class_scenario])
+
+    if len(recalculate) > 0:
+        scenario = class_scenario[recalculate]
+        surviving_air = japan.surviving_counts(scenario, japan_eliminated[recalculate])[1]
+        losses = np.ceil(japan_remaining_cf[recalculate] * DIE_CLASS_BAND[class_japan_die[recalculate]]).astype(int)
+
+        flipped, eliminated = allied.allocate_damage(scenario, losses, DIE_CLASS_CRITICAL[class_japan_die[recalculate]],
+                                                     surviving_air)
+        allied_flipped[recalculate], allied_eliminated[recalculate] = flipped, eliminated
+        allied_remaining_cf[recalculate] = allied.combat_factor(scenario, flipped, eliminated)
+
+    allied_damage_applied = allied.damage_applied(class_scenario, allied_flipped, allied_eliminated)
+    japan_damage_applied = japan.damage_applied(class_scenario, japan_flipped, japan_eliminated)
+
+    allied_surviving, allied_surviving_air = allied.surviving_counts(class_scenario, allied_eliminated)
+    japan_surviving, japan_surviving_air = japan.surviving_counts(class_scenario, japan_eliminated)
+
+    # The battle winner rules of resolve_outcome, in the same order
+    class_reaction_allies = reaction_allies[class_scenario]
+
+    allies_win = np.select(
+        [(allied_surviving == 0) & (japan_surviving == 0),
+         (allied_surviving_air == 0) & (japan_surviving_air > 0) & ~class_reaction_allies,
+         (japan_surviving_air == 0) & (allied_surviving_air > 0) & class_reaction_allies,
+         allied_remaining_cf == japan_remaining_cf],
+        [~class_reaction_allies, False, True, class_reaction_allies],
+        default=allied_remaining_cf > japan_remaining_cf)
+
+    # Weight each outcome class by its number of die roll combinations
+    counts = (allied_die_counts[class_scenario, class_allied_die] *
+              japan_die_counts[class_scenario, class_japan_die]).reshape(scenario_count, -1)
+    total_count = counts.sum(axis=1)
+
+    def expected(values):
+        return (values.reshape(scenario_count, -1) * counts).sum(axis=1) / total_count
+
+    def variance(values):
+        deviation = values.reshape(scenario_count, -1) - expected(values)[:, None]
+        return (deviation * deviation * counts).sum(axis=1) / total_count
+
+    return {
+        'allied_win_probability': expected(allies_win),
+        'allied_expected_damage_applied': expected(allied_damage_applied),
+        'allied_expected_remaining_cf': expected(allied_remaining_cf),
+        'allied_remaining_cf_variance': variance(allied_remaining_cf),
+        'japan_win_probability': expected(~allies_win),
+        'japan_expected_damage_applied': expected(japan_damage_applied),
+        'japan_expected_remaining_cf': expected(japan_remaining_cf),
+        'japan_remaining_cf_variance': variance(japan_remaining_cf)
+    }
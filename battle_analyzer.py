@@ -1,9 +1,16 @@
 import math
-import pandas as pd
-import enums
-import copy
+from collections import Counter
 from itertools import product
+import numpy as np
+import enums
 from combat_unit import CombatUnit
+from combat_force import CombatForce, as_combat_force
+from battle_summary import BattleSummary
+from result_cache import ResultCache
+
+DICE_VALUES = np.arange(10)
+
+damage_allocation_cache = ResultCache(max_size=4096)
 
 
 def combat_result(die_roll: int, drm: int):
@@ -19,189 +26,249 @@ def combat_result(die_roll: int, drm: int):
     return result
 
 
-def select_unit_for_damage(combat_forces: [CombatUnit], damage_to_apply: int, critical_hit: bool,
-                           enemy_air_unit_count: int):
-    combat_forces.sort(key=lambda x: (x.defense, -x.loss_delta()))
+class DamageAllocation:
 
-    # Find the number of air units that have already received damage
-    air_units_damaged = sum(
-        1 for u in combat_forces if (u.move_range > 0) & (u.damage_flipped | u.damage_eliminated))
+    def __init__(self, combat_force: CombatForce):
+        # Damage allocation state of a force while a single loss result is applied to it. The units still eligible
+        # for damage are kept in damage allocation order, and the counters are updated as each hit is applied.
+        self.combat_force = combat_force
 
-    for unit in combat_forces:
+        self.defense = combat_force.defense.tolist()
+        self.is_air_unit = combat_force.is_air_unit.tolist()
+        self.is_flipped = combat_force.is_flipped.tolist()
+        self.damage_flipped = combat_force.damage_flipped.tolist()
+        self.damage_eliminated = combat_force.damage_eliminated.tolist()
 
-        # Skip this unit if it has already been eliminated
-        if unit.damage_eliminated:
-            continue
+        self.candidates = [i for i in combat_force.damage_order if not self.damage_eliminated[i]]
 
-        # Skip this unit if the number of air units that have already received damage equals the
-        # enemy_air_unit_count, and this is an air unit that has NOT yet received damage.
-        if (unit.move_range > 0) & (air_units_damaged == enemy_air_unit_count) & \
-                (not unit.damage_flipped) & (not unit.damage_eliminated):
-            continue
+        # The number of air units that have already received damage
+        self.air_units_damaged = sum(1 for i in range(len(combat_force)) if self.is_air_unit[i] & (
+                self.damage_flipped[i] | self.damage_eliminated[i]))
 
-        if critical_hit:
-            # Skip this unit if the damage_to_apply is less than the defense value of the unit
-            if unit.defense > damage_to_apply:
-                continue
+        # The number of units that are not flipped
+        self.unflipped_unit_count = sum(1 for i in range(len(combat_force)) if (not self.damage_flipped[i]) & (
+            not self.is_flipped[i]))
 
-            return unit
+    def apply_hit(self, i: int):
+        if self.is_air_unit[i] & (not self.damage_flipped[i]) & (not self.damage_eliminated[i]):
+            self.air_units_damaged += 1
 
+        if self.is_flipped[i] | self.damage_flipped[i]:
+            self.damage_eliminated[i] = True
+            self.candidates.remove(i)
         else:
-            # Skip this unit if the damage_to_apply is less than the defense value of the unit
-            if unit.defense > damage_to_apply:
-                continue
+            self.damage_flipped[i] = True
+            self.unflipped_unit_count -= 1
+
+    def commit(self):
+        self.combat_force.damage_flipped[:] = self.damage_flipped
+        self.combat_force.damage_eliminated[:] = self.damage_eliminated
 
-            # Skip this unit if the unit is flipped, and there are still other units that haven't been flipped
-            unflipped_unit_count = sum(
-                1 for u in combat_forces if (not u.damage_flipped) & (not u.is_flipped))
 
-            if (unit.damage_flipped | unit.is_flipped) & (unflipped_unit_count > 0):
-                continue
+def select_unit_for_damage(allocation: DamageAllocation, damage_to_apply: int, critical_hit: bool,
+                           enemy_air_unit_count: int):
+    # The damage to apply only goes down, so units with a defense value larger than the damage_to_apply will never be
+    # selected again for this loss result
+    allocation.candidates = [i for i in allocation.candidates if allocation.defense[i] <= damage_to_apply]
+
+    # Skip air units that have NOT yet received damage if the number of air units that have already received damage
+    # equals the enemy_air_unit_count
+    skip_undamaged_air = allocation.air_units_damaged == enemy_air_unit_count
+
+    for i in allocation.candidates:
+
+        if allocation.is_air_unit[i] & skip_undamaged_air & (not allocation.damage_flipped[i]):
+            continue
+
+        if critical_hit:
+            return i
+
+        # Skip this unit if the unit is flipped, and there are still other units that haven't been flipped
+        if (allocation.damage_flipped[i] | allocation.is_flipped[i]) & (allocation.unflipped_unit_count > 0):
+            continue
 
-            return unit
+        return i
 
     # If we get through the entire list without selecting a unit, then just return None
     return None
 
 
-def apply_damage(total_losses: int, critical_hit, combat_forces, opponent_air_unit_count):
+def apply_damage(total_losses: int, critical_hit, combat_force: CombatForce, opponent_air_unit_count):
+    allocation = DamageAllocation(combat_force)
+
     damage_applied = 0
     damage_to_apply = total_losses
 
     while damage_applied < total_losses:
 
-        selected_unit = select_unit_for_damage(combat_forces, damage_to_apply, critical_hit, opponent_air_unit_count)
+        selected_unit = select_unit_for_damage(allocation, damage_to_apply, critical_hit, opponent_air_unit_count)
 
         if selected_unit is not None:
-            damage_applied += selected_unit.defense
-            damage_to_apply -= selected_unit.defense
-            # print(f'Critical Hit: {critical_hit}')
-            # print(f'Total Losses: {total_losses}')
-            # print(f'Selected unit: {selected_unit.unit_name}')
-            # print(f'Damage applied: {damage_applied}')
-            # print(f'Damage remaining to apply: {damage_to_apply}')
-            # print('============================================')
-
-            if selected_unit.is_flipped | selected_unit.damage_flipped:
-                selected_unit.damage_eliminated = True
-            else:
-                selected_unit.damage_flipped = True
+            damage_applied += allocation.defense[selected_unit]
+            damage_to_apply -= allocation.defense[selected_unit]
+
+            allocation.apply_hit(selected_unit)
 
         else:
             break
 
+    allocation.commit()
+
     # If this was a critical hit, and no units were selected for damage at all, then apply damage to
     # the unit with the smallest defense value
     if (damage_applied == 0) & critical_hit:
 
-        combat_forces.sort(key=lambda x: (x.defense, -x.loss_delta()))
-        selected_unit = combat_forces[0]
+        selected_unit = combat_force.damage_order[0]
+
+        if combat_force.is_flipped[selected_unit]:
+            combat_force.damage_eliminated[selected_unit] = True
+        else:
+            combat_force.damage_flipped[selected_unit] = True
+
+
+def allocate_damage(total_losses: int, critical_hit: bool, combat_force: CombatForce, opponent_air_unit_count: int):
+    # Damage allocation only depends on the force and the losses inflicted on it, so the resulting per-unit damage
+    # is cached and restored onto the force whenever the same allocation is needed again
+    cache_key = (combat_force.signature(), total_losses, critical_hit, opponent_air_unit_count)
+
+    damage_state = damage_allocation_cache.get(cache_key)
+
+    if damage_state is not None:
+        combat_force.restore_damage_state(*damage_state)
+        return
+
+    combat_force.reset()
+    apply_damage(total_losses, critical_hit, combat_force, opponent_air_unit_count)
+
+    damage_allocation_cache.put(cache_key, combat_force.damage_state())
+
+
+def resolve_outcome(allied_force: CombatForce, japan_force: CombatForce, allied_result: float,
+                    allied_losses: int, allied_critical_hit: bool, japan_result: float, japan_losses: int,
+                    japan_critical_hit: bool, intel_condition: enums.IntelCondition, reaction_player: enums.Player):
+    allied_air_unit_count = allied_force.air_unit_count()
+    japan_air_unit_count = japan_force.air_unit_count()
+
+    # Apply damage to Allied units
+    allocate_damage(allied_losses, allied_critical_hit, allied_force, japan_air_unit_count)
+
+    allied_damage_applied = allied_force.total_damage_applied()
+    allied_remaining_cf = allied_force.total_combat_factor()
+
+    # Apply damage to Japan units
+    allocate_damage(japan_losses, japan_critical_hit, japan_force, allied_air_unit_count)
 
-        damage_applied += selected_unit.defense
-        damage_to_apply -= selected_unit.defense
+    japan_damage_applied = japan_force.total_damage_applied()
+    japan_remaining_cf = japan_force.total_combat_factor()
 
-        if selected_unit.is_flipped:
-            selected_unit.damage_eliminated = True
+    if (intel_condition == enums.IntelCondition.SURPRISE) & (reaction_player == enums.Player.ALLIES):
+
+        # Recalculate Japan's losses using the remaining Allied forces
+        japan_losses = int(math.ceil(allied_remaining_cf * allied_result))
+        allied_air_unit_count = allied_force.surviving_air_unit_count()
+        allocate_damage(japan_losses, japan_critical_hit, japan_force, allied_air_unit_count)
+
+        japan_damage_applied = japan_force.total_damage_applied()
+        japan_remaining_cf = japan_force.total_combat_factor()
+
+    elif ((intel_condition == enums.IntelCondition.SURPRISE) & (reaction_player == enums.Player.ALLIES) | (
+            intel_condition == enums.IntelCondition.AMBUSH)):
+
+        # Recalculate Allies losses using the remaining Japan forces
+        allied_losses = int(math.ceil(japan_remaining_cf * japan_result))
+        japan_air_unit_count = japan_force.surviving_air_unit_count()
+        allocate_damage(allied_losses, allied_critical_hit, allied_force, japan_air_unit_count)
+
+        allied_damage_applied = allied_force.total_damage_applied()
+        allied_remaining_cf = allied_force.total_combat_factor()
+
+    allied_surviving_unit_count = allied_force.surviving_unit_count()
+    japan_surviving_unit_count = japan_force.surviving_unit_count()
+
+    allied_surviving_air_count = allied_force.surviving_air_unit_count()
+    japan_surviving_air_count = japan_force.surviving_air_unit_count()
+
+    if (allied_surviving_unit_count == 0) & (japan_surviving_unit_count == 0):
+        # Offensive player wins if neither side has any surviving units
+        if reaction_player == enums.Player.ALLIES:
+            battle_winner = enums.Player.JAPAN.name
         else:
-            selected_unit.damage_flipped = True
-
-
-def determine_battle_winner(allied_forces: [CombatUnit], japan_forces: [CombatUnit], combat_results: pd.DataFrame,
-                            intel_condition: enums.IntelCondition, reaction_player: enums.Player):
-    allied_air_unit_count = sum(1 for u in allied_forces if u.move_range > 0)
-    japan_air_unit_count = sum(1 for u in japan_forces if u.move_range > 0)
-
-    for row in combat_results.iterrows():
-
-        # Apply damage to Allied units
-        allied_losses = row[1]['allied_losses']
-        allied_critical_hit = row[1]['japan_die_roll'] == 9
-        allied_result = row[1]['allied_result']
-
-        allied_combat_forces = copy.deepcopy(allied_forces)
-
-        apply_damage(allied_losses, allied_critical_hit, allied_combat_forces, japan_air_unit_count)
-
-        allied_damage_applied = sum(map(lambda x: x.damage_applied(), allied_combat_forces))
-        allied_remaining_cf = sum(map(lambda x: x.combat_factor(), allied_combat_forces))
-
-        # Apply damage to Japan units
-        japan_losses = row[1]['japan_losses']
-        japan_critical_hit = row[1]['allied_die_roll'] == 9
-        japan_result = row[1]['japan_result']
-
-        japan_combat_forces = copy.deepcopy(japan_forces)
-
-        apply_damage(japan_losses, japan_critical_hit, japan_combat_forces, allied_air_unit_count)
-
-        japan_damage_applied = sum(map(lambda x: x.damage_applied(), japan_combat_forces))
-        japan_remaining_cf = sum(map(lambda x: x.combat_factor(), japan_combat_forces))
-
-        if (intel_condition == enums.IntelCondition.SURPRISE) & (reaction_player == enums.Player.ALLIES):
-
-            # Recalculate Japan's losses using the remaining Allied forces
-            japan_losses = int(math.ceil(allied_remaining_cf * allied_result))
-            japan_combat_forces = copy.deepcopy(japan_forces)
-            allied_air_unit_count = sum(
-                1 for u in allied_combat_forces if (u.move_range > 0) & (not u.damage_eliminated))
-            apply_damage(japan_losses, japan_critical_hit, japan_combat_forces, allied_air_unit_count)
-
-            japan_damage_applied = sum(map(lambda x: x.damage_applied(), japan_combat_forces))
-            japan_remaining_cf = sum(map(lambda x: x.combat_factor(), japan_combat_forces))
-
-        elif ((intel_condition == enums.IntelCondition.SURPRISE) & (reaction_player == enums.Player.ALLIES) | (
-                intel_condition == enums.IntelCondition.AMBUSH)):
-
-            # Recalculate Allies losses using the remaining Japan forces
-            allied_losses = int(math.ceil(japan_remaining_cf * japan_result))
-            allied_combat_forces = copy.deepcopy(allied_forces)
-            japan_air_unit_count = sum(1 for u in japan_combat_forces if (u.move_range > 0) & (not u.damage_eliminated))
-            apply_damage(allied_losses, allied_critical_hit, allied_combat_forces, japan_air_unit_count)
-
-            allied_damage_applied = sum(map(lambda x: x.damage_applied(), allied_combat_forces))
-            allied_remaining_cf = sum(map(lambda x: x.combat_factor(), allied_combat_forces))
-
-        combat_results.loc[row[0], 'allied_damage_applied'] = allied_damage_applied
-        combat_results.loc[row[0], 'allied_remaining_cf'] = allied_remaining_cf
-        combat_results.loc[row[0], 'allied_losses'] = allied_losses
-
-        combat_results.loc[row[0], 'japan_damage_applied'] = japan_damage_applied
-        combat_results.loc[row[0], 'japan_remaining_cf'] = japan_remaining_cf
-        combat_results.loc[row[0], 'japan_losses'] = japan_losses
-
-        allied_surviving_unit_count = sum(1 for u in allied_combat_forces if (not u.damage_eliminated))
-        japan_surviving_unit_count = sum(1 for u in japan_combat_forces if (not u.damage_eliminated))
-
-        allied_surviving_air_count = sum(
-            1 for u in allied_combat_forces if (u.move_range > 0) & (not u.damage_eliminated))
-        japan_surviving_air_count = sum(
-            1 for u in japan_combat_forces if (u.move_range > 0) & (not u.damage_eliminated))
-
-        if (allied_surviving_unit_count == 0) & (japan_surviving_unit_count == 0):
-            # Offensive player wins if neither side has any surviving units
-            if reaction_player == enums.Player.ALLIES:
-                combat_results.loc[row[0], 'battle_winner'] = enums.Player.JAPAN.name
-            else:
-                combat_results.loc[row[0], 'battle_winner'] = enums.Player.ALLIES.name
-        elif (allied_surviving_air_count == 0) & (japan_surviving_air_count > 0) & (
-                reaction_player == enums.Player.JAPAN):
-            # Reaction player wins if the Offensive player has no Air capable unit but the Reaction player does
-            combat_results.loc[row[0], 'battle_winner'] = enums.Player.JAPAN.name
-        elif (japan_surviving_air_count == 0) & (allied_surviving_air_count > 0) & (
-                reaction_player == enums.Player.ALLIES):
-            # Reaction player wins if the Offensive player has no Air capable unit but the Reaction player does
-            combat_results.loc[row[0], 'battle_winner'] = enums.Player.ALLIES.name
-        elif allied_remaining_cf == japan_remaining_cf:
-            # Reaction player wins ties
-            if reaction_player == enums.Player.ALLIES:
-                combat_results.loc[row[0], 'battle_winner'] = enums.Player.ALLIES.name
-            else:
-                combat_results.loc[row[0], 'battle_winner'] = enums.Player.JAPAN.name
+            battle_winner = enums.Player.ALLIES.name
+    elif (allied_surviving_air_count == 0) & (japan_surviving_air_count > 0) & (
+            reaction_player == enums.Player.JAPAN):
+        # Reaction player wins if the Offensive player has no Air capable unit but the Reaction player does
+        battle_winner = enums.Player.JAPAN.name
+    elif (japan_surviving_air_count == 0) & (allied_surviving_air_count > 0) & (
+            reaction_player == enums.Player.ALLIES):
+        # Reaction player wins if the Offensive player has no Air capable unit but the Reaction player does
+        battle_winner = enums.Player.ALLIES.name
+    elif allied_remaining_cf == japan_remaining_cf:
+        # Reaction player wins ties
+        if reaction_player == enums.Player.ALLIES:
+            battle_winner = enums.Player.ALLIES.name
         else:
-            if allied_remaining_cf > japan_remaining_cf:
-                combat_results.loc[row[0], 'battle_winner'] = enums.Player.ALLIES.name
-            elif japan_remaining_cf > allied_remaining_cf:
-                combat_results.loc[row[0], 'battle_winner'] = enums.Player.JAPAN.name
+            battle_winner = enums.Player.JAPAN.name
+    elif allied_remaining_cf > japan_remaining_cf:
+        battle_winner = enums.Player.ALLIES.name
+    else:
+        battle_winner = enums.Player.JAPAN.name
+
+    return {
+        'allied_damage_applied': allied_damage_applied,
+        'allied_remaining_cf': allied_remaining_cf,
+        'allied_losses': allied_losses,
+        'japan_damage_applied': japan_damage_applied,
+        'japan_remaining_cf': japan_remaining_cf,
+        'japan_losses': japan_losses,
+        'battle_winner': battle_winner
+    }
+
+
+def outcome_classes(combat_results: dict):
+    # The outcome of a die roll combination only depends on the result band of each player's roll and on whether
+    # either die is a 9 (critical hit), so the 100 combinations collapse into a handful of distinct outcome classes
+    class_keys = zip(combat_results['allied_result'].tolist(), (combat_results['japan_die_roll'] == 9).tolist(),
+                     combat_results['japan_result'].tolist(), (combat_results['allied_die_roll'] == 9).tolist())
+
+    classes = {}
+
+    for i, class_key in enumerate(class_keys):
+        classes.setdefault(class_key, []).append(i)
+
+    return classes
+
+
+def determine_battle_winner(allied_forces: [CombatUnit], japan_forces: [CombatUnit], combat_results: dict,
+                            intel_condition: enums.IntelCondition, reaction_player: enums.Player,
+                            resolved_outcomes: dict = None):
+    # combat_results holds the preallocated NumPy result columns, which are filled in place
+    # resolved_outcomes optionally holds outcomes already resolved for the same forces, intel condition and
+    # reaction player, keyed by outcome class
+    allied_force = as_combat_force(allied_forces)
+    japan_force = as_combat_force(japan_forces)
+
+    if resolved_outcomes is None:
+        resolved_outcomes = {}
+
+    # Resolve each outcome class once, and apply the outcome to every die roll combination in the class
+    for class_key, index in outcome_classes(combat_results).items():
+        allied_result, allied_critical_hit, japan_result, japan_critical_hit = class_key
+
+        outcome = resolved_outcomes.get(class_key)
+
+        if outcome is None:
+            outcome = resolve_outcome(allied_force, japan_force,
+                                      allied_result=allied_result,
+                                      allied_losses=int(combat_results['allied_losses'][index[0]]),
+                                      allied_critical_hit=allied_critical_hit,
+                                      japan_result=japan_result,
+                                      japan_losses=int(combat_results['japan_losses'][index[0]]),
+                                      japan_critical_hit=japan_critical_hit,
+                                      intel_condition=intel_condition, reaction_player=reaction_player)
+            resolved_outcomes[class_key] = outcome
+
+        for column, value in outcome.items():
+            combat_results[column][index] = value
 
 
 class BattleAnalyzer:
@@ -236,61 +303,168 @@ class BattleAnalyzer:
 
         return drm
 
-    def analyze_battle(self, allied_forces: [CombatUnit], japan_forces: [CombatUnit]):
-        dice_values = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
-        die_combinations = product(dice_values, repeat=2)
+    def scenario_key(self, allied_forces: CombatForce, japan_forces: CombatForce):
+        # The units are kept in their selected order, since it breaks ties in the damage allocation order
+        return (as_combat_force(allied_forces).signature(), as_combat_force(japan_forces).signature(),
+                self.intel_condition.value, self.reaction_player.value, int(self.air_power_mod),
+                self.allied_ec_mod, self.japan_ec_mod)
+
+    def battle_results(self, allied_forces: [CombatUnit], japan_forces: [CombatUnit], resolved_outcomes: dict = None):
+        # Every combination of the two die rolls, with the Allied die roll varying slowest
+        allied_die_rolls = np.repeat(DICE_VALUES, len(DICE_VALUES))
+        japan_die_rolls = np.tile(DICE_VALUES, len(DICE_VALUES))
 
-        allied_die_rolls = []
-        allied_results = []
-        allied_losses = []
+        allied_forces = as_combat_force(allied_forces)
+        japan_forces = as_combat_force(japan_forces)
 
-        japan_die_rolls = []
-        japan_results = []
-        japan_losses = []
+        # Clear any damage left on the forces by a previous analysis
+        allied_forces.reset()
+        japan_forces.reset()
 
-        allied_forces_cf = sum(map(lambda x: x.combat_factor(), allied_forces))
-        japan_forces_cf = sum(map(lambda x: x.combat_factor(), japan_forces))
+        allied_forces_cf = allied_forces.total_combat_factor()
+        japan_forces_cf = japan_forces.total_combat_factor()
 
         allied_drm = self.die_roll_modifier(enums.Player.ALLIES)
         japan_drm = self.die_roll_modifier(enums.Player.JAPAN)
 
-        for die_roll in die_combinations:
-            allied_die_roll = die_roll[0]
-            japan_die_roll = die_roll[1]
-
-            allied_result = combat_result(allied_die_roll, allied_drm)
-            japan_result = combat_result(japan_die_roll, japan_drm)
-
-            # The Combat Factor loss inflicted on the player's forces by his opponent
-            # The actual Battle losses are determined based on damage allocation
-            japan_loss_result = math.ceil(allied_forces_cf * allied_result)
-            allied_loss_result = math.ceil(japan_forces_cf * japan_result)
+        allied_results = np.array([combat_result(x, allied_drm) for x in DICE_VALUES])[allied_die_rolls]
+        japan_results = np.array([combat_result(x, japan_drm) for x in DICE_VALUES])[japan_die_rolls]
 
-            allied_die_rolls.append(allied_die_roll)
-            allied_results.append(allied_result)
-            allied_losses.append(allied_loss_result)
+        # The Combat Factor loss inflicted on the player's forces by his opponent
+        # The actual Battle losses are determined based on damage allocation
+        japan_losses = np.ceil(allied_forces_cf * allied_results).astype(int)
+        allied_losses = np.ceil(japan_forces_cf * japan_results).astype(int)
 
-            japan_die_rolls.append(japan_die_roll)
-            japan_results.append(japan_result)
-            japan_losses.append(japan_loss_result)
+        row_count = len(allied_die_rolls)
 
         results_data = {
             'allied_die_roll': allied_die_rolls,
             'allied_result': allied_results,
             'allied_losses': allied_losses,
-            'allied_damage_applied': 0,
-            'allied_remaining_cf': 0,
+            'allied_damage_applied': np.zeros(row_count, dtype=int),
+            'allied_remaining_cf': np.zeros(row_count, dtype=int),
             'japan_die_roll': japan_die_rolls,
             'japan_result': japan_results,
             'japan_losses': japan_losses,
-            'japan_damage_applied': 0,
-            'japan_remaining_cf': 0,
-            'battle_winner': enums.Player.UNKNOWN
+            'japan_damage_applied': np.zeros(row_count, dtype=int),
+            'japan_remaining_cf': np.zeros(row_count, dtype=int),
+            'battle_winner': np.full(row_count, enums.Player.UNKNOWN.name, dtype=object)
         }
 
-        combat_results = pd.DataFrame(data=results_data)
+        determine_battle_winner(allied_forces, japan_forces, results_data, intel_condition=self.intel_condition,
+                                reaction_player=self.reaction_player, resolved_outcomes=resolved_outcomes)
 
-        determine_battle_winner(allied_forces, japan_forces, combat_results, intel_condition=self.intel_condition,
-                                reaction_player=self.reaction_player)
+        return results_data
+
+    def analyze_battle(self, allied_forces: [CombatUnit], japan_forces: [CombatUnit]):
+        # pandas is only loaded when a results frame is asked for, so the battle engine imports without it
+        import pandas as pd
+
+        results_data = self.battle_results(allied_forces, japan_forces)
+
+        results_data['battle_winner'] = pd.Categorical(results_data['battle_winner'],
+                                                       categories=[enums.Player.ALLIES.name, enums.Player.JAPAN.name])
+
+        return pd.DataFrame(data=results_data)
+
+    def outcome_class_counts(self):
+        # The outcome class of a single die roll for each player: the result band of the roll, and whether it is a
+        # critical hit against the opponent
+        allied_drm = self.die_roll_modifier(enums.Player.ALLIES)
+        japan_drm = self.die_roll_modifier(enums.Player.JAPAN)
 
-        return combat_results
+        allied_die_classes = Counter((combat_result(x, allied_drm), x == 9) for x in DICE_VALUES.tolist())
+        japan_die_classes = Counter((combat_result(x, japan_drm), x == 9) for x in DICE_VALUES.tolist())
+
+        class_counts = {}
+
+        for (allied_result, japan_critical_hit), allied_count in allied_die_classes.items():
+            for (japan_result, allied_critical_hit), japan_count in japan_die_classes.items():
+                class_key = (allied_result, allied_critical_hit, japan_result, japan_critical_hit)
+                class_counts[class_key] = allied_count * japan_count
+
+        return class_counts
+
+    def summarize_battle(self, allied_forces: [CombatUnit], japan_forces: [CombatUnit],
+                         resolved_outcomes: dict = None):
+        allied_forces = as_combat_force(allied_forces)
+        japan_forces = as_combat_force(japan_forces)
+
+        allied_forces.reset()
+        japan_forces.reset()
+
+        allied_forces_cf = allied_forces.total_combat_factor()
+        japan_forces_cf = japan_forces.total_combat_factor()
+
+        if resolved_outcomes is None:
+            resolved_outcomes = {}
+
+        outcomes = []
+        counts = []
+
+        for class_key, count in self.outcome_class_counts().items():
+            allied_result, allied_critical_hit, japan_result, japan_critical_hit = class_key
+
+            outcome = resolved_outcomes.get(class_key)
+
+            if outcome is None:
+                outcome = resolve_outcome(allied_forces, japan_forces,
+                                          allied_result=allied_result,
+                                          allied_losses=int(math.ceil(japan_forces_cf * japan_result)),
+                                          allied_critical_hit=allied_critical_hit,
+                                          japan_result=japan_result,
+                                          japan_losses=int(math.ceil(allied_forces_cf * allied_result)),
+                                          japan_critical_hit=japan_critical_hit,
+                                          intel_condition=self.intel_condition,
+                                          reaction_player=self.reaction_player)
+                resolved_outcomes[class_key] = outcome
+
+            outcomes.append(outcome)
+            counts.append(count)
+
+        return BattleSummary(outcomes, counts,
+                             results_factory=lambda: self.analyze_battle(allied_forces, japan_forces))
+
+    @classmethod
+    def sweep(cls, allied_forces: [CombatUnit], japan_forces: [CombatUnit], intel_conditions=None,
+              reaction_players=None, air_power_mods=None, allied_ec_mods=None, japan_ec_mods=None):
+        import pandas as pd
+
+        intel_conditions = list(enums.IntelCondition) if intel_conditions is None else intel_conditions
+        reaction_players = [enums.Player.ALLIES, enums.Player.JAPAN] if reaction_players is None else reaction_players
+        air_power_mods = list(enums.AirPowerModifier) if air_power_mods is None else air_power_mods
+        allied_ec_mods = range(-2, 3) if allied_ec_mods is None else allied_ec_mods
+        japan_ec_mods = range(-2, 3) if japan_ec_mods is None else japan_ec_mods
+
+        allied_forces = as_combat_force(allied_forces)
+        japan_forces = as_combat_force(japan_forces)
+
+        # The modifiers only change which outcome class each die roll combination falls into, so the outcome
+        # classes are resolved once per intel condition and reaction player and shared by every modifier combination
+        resolved_outcomes = {}
+        sweep_results = []
+
+        for intel_condition, reaction_player, air_power_mod, allied_ec_mod, japan_ec_mod in \
+                product(intel_conditions, reaction_players, air_power_mods, allied_ec_mods, japan_ec_mods):
+
+            analyzer = cls(intel_condition=intel_condition, reaction_player=reaction_player,
+                           air_power_mod=air_power_mod, allied_ec_mod=allied_ec_mod, japan_ec_mod=japan_ec_mod)
+
+            summary = analyzer.summarize_battle(
+                allied_forces, japan_forces,
+                resolved_outcomes=resolved_outcomes.setdefault((intel_condition, reaction_player), {}))
+
+            for player in [enums.Player.ALLIES, enums.Player.JAPAN]:
+                sweep_results.append({
+                    'intel_condition': intel_condition.name,
+                    'reaction_player': reaction_player.name,
+                    'air_power_mod': int(air_power_mod),
+                    'allied_ec_mod': allied_ec_mod,
+                    'japan_ec_mod': japan_ec_mod,
+                    'player': player.name,
+                    'win_probability': summary.win_probability(player),
+                    'expected_damage_applied': summary.expected_damage_applied(player),
+                    'expected_remaining_cf': summary.expected_remaining_cf(player)
+                })
+
+        return pd.DataFrame(data=sweep_results)
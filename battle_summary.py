@@ -0,0 +1,52 @@
+import numpy as np
+import enums
+
+
+class BattleSummary:
+
+    def __init__(self, outcomes: [dict], counts: [int], results_factory=None):
+        # Each outcome is a resolved outcome class, and counts holds the number of die roll combinations in the class
+        self.counts = np.array(counts, dtype=int)
+        self.total_count = int(self.counts.sum())
+
+        self.battle_winner = np.array([x['battle_winner'] for x in outcomes], dtype=object)
+
+        self.damage_applied = {
+            enums.Player.ALLIES: np.array([x['allied_damage_applied'] for x in outcomes], dtype=int),
+            enums.Player.JAPAN: np.array([x['japan_damage_applied'] for x in outcomes], dtype=int)
+        }
+
+        self.remaining_cf = {
+            enums.Player.ALLIES: np.array([x['allied_remaining_cf'] for x in outcomes], dtype=int),
+            enums.Player.JAPAN: np.array([x['japan_remaining_cf'] for x in outcomes], dtype=int)
+        }
+
+        # The per die roll results frame is only built when it is asked for
+        self.results_factory = results_factory
+        self.combat_results = None
+
+    def win_probability(self, player: enums.Player):
+        return self.counts[self.battle_winner == player.name].sum() / self.total_count
+
+    def loss_distribution(self, player: enums.Player):
+        # The probability of each total amount of damage applied to the player's forces
+        damage_values, inverse = np.unique(self.damage_applied[player], return_inverse=True)
+
+        return damage_values, np.bincount(inverse, weights=self.counts) / self.total_count
+
+    def expected_damage_applied(self, player: enums.Player):
+        return (self.damage_applied[player] * self.counts).sum() / self.total_count
+
+    def expected_remaining_cf(self, player: enums.Player):
+        return (self.remaining_cf[player] * self.counts).sum() / self.total_count
+
+    def remaining_cf_variance(self, player: enums.Player):
+        deviation = self.remaining_cf[player] - self.expected_remaining_cf(player)
+
+        return (deviation * deviation * self.counts).sum() / self.total_count
+
+    def results(self):
+        if (self.combat_results is None) & (self.results_factory is not None):
+            self.combat_results = self.results_factory()
+
+        return self.combat_results
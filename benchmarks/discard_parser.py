@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from acts_session import parse_discards
+
+DISCARDS_PAGE = os.path.join(ROOT_DIR, 'data', 'acts_fixture', 'discards_all.html')
+
+
+def large_discards_page(repeat: int):
+    # The recorded discards page with the rows of each table repeated, as in a long game with many reshuffles
+    with open(DISCARDS_PAGE, 'rb') as f:
+        page = f.read().decode()
+
+    head, _, rest = page.partition('<table')
+    tables = ['<table' + x for x in rest.split('<table')]
+
+    large_tables = []
+    for table in tables:
+        opening, _, table_rest = table.partition('>')
+        rows, _, closing = table_rest.rpartition('</table>')
+        large_tables.append(opening + '>' + rows * repeat + '</table>' + closing)
+
+    return (head + ''.join(large_tables)).encode()
+
+
+def parse_discards_tree(page):
+    # The full document tree parse used before the streaming parser
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, 'html.parser')
+    card_list = []
+
+    table_list = soup.find_all('table', border='0', cellpadding='3', width='100%')
+
+    for i in range(len(table_list)):
+        for x in table_list[i].find_all('td', class_='textcenter', width='10%'):
+            card_list.append({'player_id': i, 'card_id': int(x.text)})
+
+    return card_list
+
+
+def measure(parse, page, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(page)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, min(times), peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the discard page parsers on large recorded pages')
+    parser.add_argument('--rows', type=int, nargs='*', default=[100, 1000, 5000],
+                        help='Number of copies of the recorded discard rows')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed parses per page')
+    args = parser.parse_args()
+
+    try:
+        import bs4
+    except ImportError:
+        bs4 = None
+
+    print(f'{"page KB":>10}{"records":>10}{"stream ms":>12}{"stream KB":>12}{"tree ms":>12}{"tree KB":>12}')
+
+    for rows in args.rows:
+        page = large_discards_page(rows)
+        records, stream_time, stream_peak = measure(parse_discards, page, args.repeat)
+
+        line = f'{len(page) / 1024:>10.0f}{len(records):>10}{stream_time * 1000:>12.1f}{stream_peak / 1024:>12.0f}'
+
+        if bs4 is not None:
+            tree_records, tree_time, tree_peak = measure(parse_discards_tree, page, args.repeat)
+
+            if tree_records != records:
+                raise AssertionError(f'The parsers disagree on the page with {rows} copies of the rows')
+
+            line += f'{tree_time * 1000:>12.1f}{tree_peak / 1024:>12.0f}'
+
+        print(line)
@@ -0,0 +1,242 @@
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import enums
+from battle_analyzer import BattleAnalyzer, apply_damage, damage_allocation_cache
+from batch_engine import summarize_battles
+from card_analyzer import load_card_data
+from card_probability import DeckProbability, HAND_SIZES
+from combat_force import CombatForce
+from unit_registry import load_registry
+
+SEED = 20220214
+
+# The timings depend on the host, so the baseline isn't committed. Record one on this host with --save-baseline, e.g.
+# on the commit before a change, and later runs on the same host are checked against it.
+BASELINE_FILE = os.path.join(ROOT_DIR, 'benchmarks', 'baseline.json')
+
+# Units per side in the small, medium and large scenarios
+FORCE_SIZES = {'small': 3, 'medium': 8, 'large': 20}
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    # A benchmark function does its setup and returns the callable that is timed
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+
+    return register
+
+
+def scenario_forces(size: str):
+    # The same units are picked on every run, from the Air and Naval units with a back side
+    unit_registry = load_registry()
+    rng = random.Random(f'{SEED}-{size}')
+
+    forces = []
+    for player in [enums.Player.ALLIES, enums.Player.JAPAN]:
+        units = [x for x in unit_registry.find(player=player, unit_type=[enums.UnitType.AIR, enums.UnitType.NAVAL])
+                 if not math.isnan(x.attack_back)]
+        selected = rng.sample(units, FORCE_SIZES[size])
+
+        forces.append(CombatForce(selected, is_flipped=[rng.random() < 0.25 for _ in selected],
+                                  is_in_battle_hex=[True] * len(selected)))
+
+    return forces
+
+
+def battle_benchmark(size: str, intel_condition: enums.IntelCondition):
+    allied_force, japan_force = scenario_forces(size)
+    analyzers = [BattleAnalyzer(intel_condition=intel_condition, reaction_player=x)
+                 for x in [enums.Player.ALLIES, enums.Player.JAPAN]]
+
+    def run():
+        # Every run starts from an empty damage allocation cache, as the first analysis of a new scenario does
+        damage_allocation_cache.clear()
+
+        for analyzer in analyzers:
+            analyzer.summarize_battle(allied_force, japan_force)
+
+    return run
+
+
+for force_size in FORCE_SIZES:
+    for condition in enums.IntelCondition:
+        benchmark(f'battle/{force_size}/{condition.name.lower()}')(
+            lambda size=force_size, intel_condition=condition: battle_benchmark(size, intel_condition))
+
+
+@benchmark('battle/medium/results_frame')
+def results_frame_benchmark():
+    allied_force, japan_force = scenario_forces('medium')
+    analyzer = BattleAnalyzer(intel_condition=enums.IntelCondition.SURPRISE)
+
+    def run():
+        damage_allocation_cache.clear()
+        analyzer.analyze_battle(allied_force, japan_force)
+
+    return run
+
+
+@benchmark('battle/medium/sweep')
+def sweep_benchmark():
+    allied_force, japan_force = scenario_forces('medium')
+
+    def run():
+        damage_allocation_cache.clear()
+        BattleAnalyzer.sweep(allied_force, japan_force)
+
+    return run
+
+
+@benchmark('batch/medium/summarize_battles')
+def batch_benchmark():
+    # The medium scenario under every intel condition, reaction player and EC modifier, resolved in one call
+    allied_force, japan_force = scenario_forces('medium')
+    scenarios = [(allied_force, japan_force, BattleAnalyzer(intel_condition=intel_condition, reaction_player=player,
+                                                            allied_ec_mod=allied_ec_mod, japan_ec_mod=japan_ec_mod))
+                 for intel_condition in enums.IntelCondition
+                 for player in [enums.Player.ALLIES, enums.Player.JAPAN]
+                 for allied_ec_mod in range(-2, 3)
+                 for japan_ec_mod in range(-2, 3)]
+
+    def run():
+        summarize_battles(scenarios)
+
+    return run
+
+
+@benchmark('damage/large/apply_damage')
+def damage_benchmark():
+    allied_force, japan_force = scenario_forces('large')
+    rng = random.Random(SEED)
+    total_cf = allied_force.total_combat_factor()
+    hits = [(rng.randint(0, total_cf), rng.random() < 0.1, rng.randint(0, 6)) for _ in range(200)]
+
+    def run():
+        for total_losses, critical_hit, opponent_air_unit_count in hits:
+            allied_force.reset()
+            apply_damage(total_losses, critical_hit, allied_force, opponent_air_unit_count)
+
+    return run
+
+
+def card_benchmark(player: enums.Player):
+    deck_df = load_card_data(player)
+    rng = random.Random(SEED)
+    discard_ids = rng.sample(deck_df['card_id'].tolist(), len(deck_df) // 3)
+
+    def run():
+        deck_probability = DeckProbability(deck_df)
+        in_deck = deck_probability.in_deck(discard_ids=discard_ids)
+
+        for at_least in [1, 2, 3]:
+            deck_probability.probabilities(draw_counts=HAND_SIZES, at_least=at_least, in_deck=in_deck)
+
+        deck_probability.joint_probability(['3 OP', 'ISR Ender'], draw_counts=HAND_SIZES, in_deck=in_deck)
+
+    return run
+
+
+benchmark('cards/allies/all_hand_sizes')(lambda: card_benchmark(enums.Player.ALLIES))
+benchmark('cards/japan/all_hand_sizes')(lambda: card_benchmark(enums.Player.JAPAN))
+
+
+def measure(run, min_time: float, min_rounds: int):
+    run()
+
+    times = []
+    start = time.perf_counter()
+
+    while (len(times) < min_rounds) | (time.perf_counter() - start < min_time):
+        round_start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - round_start)
+
+    # Peak memory is measured in a separate run, since tracing slows the timed runs down
+    tracemalloc.start()
+    run()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+
+    return {'median_ms': median * 1000, 'ops_per_second': 1 / median, 'rounds': len(times),
+            'peak_memory_kb': peak_memory / 1024}
+
+
+def check_regressions(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result['median_ms'] / baseline[name]['median_ms']
+
+        if ratio > tolerance:
+            regressions.append(f'{name}: {result["median_ms"]:.2f}ms is {ratio:.2f}x the baseline '
+                               f'{baseline[name]["median_ms"]:.2f}ms')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the battle engine and card probabilities')
+    parser.add_argument('--filter', default='', help='Only run the benchmarks whose name contains this text')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Minimum timed seconds per benchmark')
+    parser.add_argument('--min-rounds', type=int, default=5, help='Minimum timed runs per benchmark')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline results recorded on this host, to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Fail when a benchmark is more than this many times slower than the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--json', default=None, help='Also write the results to this file')
+    args = parser.parse_args()
+
+    results = {}
+
+    print(f'{"benchmark":<36}{"median ms":>12}{"ops/s":>12}{"rounds":>8}{"peak KB":>10}')
+
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+
+        results[name] = measure(setup(), args.min_time, args.min_rounds)
+        result = results[name]
+
+        print(f'{name:<36}{result["median_ms"]:>12.2f}{result["ops_per_second"]:>12.1f}{result["rounds"]:>8}'
+              f'{result["peak_memory_kb"]:>10.0f}')
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+        print(f'Saved the baseline to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = check_regressions(results, json.load(f), args.tolerance)
+
+        if len(regressions) > 0:
+            print('Regressions:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+
+        print(f'No regressions beyond {args.tolerance}x the baseline')
+    else:
+        print(f'No baseline at {args.baseline}, record one on this host with --save-baseline')
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_MODULES = ['battle_analyzer', 'force_optimizer', 'unit_registry', 'card_analyzer', 'batch_analyzer', 'plots',
+                 'main', 'app']
+
+# Modules that should only be loaded by the code paths that need them
+HEAVY_MODULES = ['pandas', 'plotly.graph_objs', 'bs4', 'mechanize', 'IPython']
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+try:
+    import {module}
+    error = None
+except Exception as e:
+    error = f'{{type(e).__name__}}: {{e}}'
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'error': error,
+                  'loaded': [x for x in {heavy_modules!r} if x in sys.modules]}}))
+'''
+
+
+def time_import(module: str):
+    # Each import runs in a fresh interpreter, so nothing is already in sys.modules
+    script = IMPORT_SCRIPT.format(module=module, heavy_modules=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT_DIR, capture_output=True, text=True,
+                            check=True).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark_imports(modules: [str], repeat: int):
+    results = []
+
+    for module in modules:
+        runs = [time_import(module) for _ in range(repeat)]
+
+        results.append({
+            'module': module,
+            'median_ms': statistics.median(x['elapsed'] for x in runs) * 1000,
+            'loaded': runs[-1]['loaded'],
+            'error': runs[-1]['error']
+        })
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the cold start import time of the entry modules')
+    parser.add_argument('modules', nargs='*', default=ENTRY_MODULES, help='Modules to import')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of fresh interpreters per module')
+    args = parser.parse_args()
+
+    print(f'{"module":<18}{"median ms":>12}  heavy modules loaded')
+
+    for result in benchmark_imports(args.modules + HEAVY_MODULES, args.repeat):
+        if result['error'] is not None:
+            print(f'{result["module"]:<18}{"-":>12}  {result["error"]}')
+        else:
+            print(f'{result["module"]:<18}{result["median_ms"]:>12.1f}  {", ".join(result["loaded"]) or "-"}')
@@ -0,0 +1,226 @@
+import math
+import numpy as np
+import enums
+from combat_unit import CombatUnit
+from combat_force import CombatForce, as_combat_force
+from battle_analyzer import BattleAnalyzer, resolve_outcome
+
+PLAYER_CODES = {enums.Player.ALLIES.name: 0, enums.Player.JAPAN.name: 1}
+
+# The winner code of a battle that was not fought, because one side had no units left
+NO_BATTLE = -1
+
+
+class CampaignResult:
+
+    def __init__(self, results: dict, batch_size: int):
+        # Each result column has one row per trial and one column per battle
+        self.results = results
+        self.batch_size = batch_size
+        self.trial_count, self.battle_count = results['battle_winner'].shape
+
+    def battle_index(self, battle: int):
+        return range(self.battle_count)[battle]
+
+    def wins(self, player: enums.Player, battle: int = -1):
+        return self.results['battle_winner'][:, self.battle_index(battle)] == PLAYER_CODES[player.name]
+
+    def win_probability(self, player: enums.Player, battle: int = -1):
+        return self.wins(player, battle).mean()
+
+    def standard_error(self, player: enums.Player, battle: int = -1):
+        probability = self.win_probability(player, battle)
+
+        return math.sqrt(probability * (1 - probability) / self.trial_count)
+
+    def battles_won_distribution(self, player: enums.Player):
+        # The probability of the player winning each number of battles over the campaign
+        battles_won = (self.results['battle_winner'] == PLAYER_CODES[player.name]).sum(axis=1)
+
+        return np.arange(self.battle_count + 1), np.bincount(battles_won, minlength=self.battle_count + 1) / \
+            self.trial_count
+
+    def expected_damage_applied(self, player: enums.Player, battle: int = None):
+        # The damage applied to the player's forces in one battle, or over the whole campaign
+        damage_applied = self.results[f'{player_prefix(player)}_damage_applied']
+
+        if battle is None:
+            return damage_applied.sum(axis=1).mean()
+
+        return damage_applied[:, self.battle_index(battle)].mean()
+
+    def expected_remaining_cf(self, player: enums.Player, battle: int = -1):
+        return self.results[f'{player_prefix(player)}_remaining_cf'][:, self.battle_index(battle)].mean()
+
+    def convergence(self, player: enums.Player = enums.Player.ALLIES, battle: int = -1):
+        # The running estimate of the player's win probability after each batch of trials, with its binomial standard
+        # error, and the standard error estimated from the spread of the batch estimates
+        wins = self.wins(player, battle)
+        batch_ends = np.append(np.arange(self.batch_size, self.trial_count, self.batch_size), self.trial_count)
+
+        trial_count = batch_ends
+        estimate = np.cumsum(wins)[batch_ends - 1] / trial_count
+        standard_error = np.sqrt(estimate * (1 - estimate) / trial_count)
+
+        batch_estimates = np.array([x.mean() for x in np.split(wins, batch_ends[:-1])])
+        batch_means_error = np.array([batch_estimates[:i + 1].std(ddof=1) / math.sqrt(i + 1) if i > 0 else np.nan
+                                      for i in range(len(batch_estimates))])
+
+        return {
+            'trial_count': trial_count,
+            'win_probability': estimate,
+            'standard_error': standard_error,
+            'batch_means_error': batch_means_error
+        }
+
+    def converged(self, tolerance: float = 0.01, player: enums.Player = enums.Player.ALLIES, battle: int = -1):
+        # Whether the 95% confidence interval of the win probability is narrower than +/- tolerance
+        return 1.96 * self.standard_error(player, battle) <= tolerance
+
+
+def player_prefix(player: enums.Player):
+    return 'allied' if player == enums.Player.ALLIES else 'japan'
+
+
+class CampaignSimulator:
+
+    def __init__(self, allied_forces: [CombatUnit], japan_forces: [CombatUnit], battles: [BattleAnalyzer]):
+        # The same forces fight each battle in turn, with the units flipped or eliminated in a battle carried into the
+        # next one. Each battle has its own intel condition, reaction player and modifiers.
+        self.allied_force = as_combat_force(allied_forces)
+        self.japan_force = as_combat_force(japan_forces)
+        self.battles = list(battles)
+
+        # Force states are (allied flipped, allied surviving, japan flipped, japan surviving) unit masks, numbered in
+        # the order they are first reached
+        self.states = []
+        self.state_index = {}
+        self.initial_state = self.state_id(self.allied_force.is_flipped, np.ones(len(self.allied_force), dtype=bool),
+                                           self.japan_force.is_flipped, np.ones(len(self.japan_force), dtype=bool))
+
+        # The exact outcome distribution of a battle from a force state, computed once per battle settings and state
+        self.transitions = {}
+
+    def state_id(self, allied_flipped, allied_surviving, japan_flipped, japan_surviving):
+        key = (allied_flipped.tobytes(), allied_surviving.tobytes(), japan_flipped.tobytes(), japan_surviving.tobytes())
+
+        if key not in self.state_index:
+            self.state_index[key] = len(self.states)
+            self.states.append((allied_flipped, allied_surviving, japan_flipped, japan_surviving))
+
+        return self.state_index[key]
+
+    def state_force(self, force: CombatForce, is_flipped, is_surviving):
+        rows = np.flatnonzero(is_surviving)
+
+        return CombatForce([force.combat_units[i] for i in rows], is_flipped=is_flipped[rows],
+                           is_in_battle_hex=force.is_in_battle_hex[rows],
+                           is_extended_range=force.is_extended_range[rows],
+                           attack_modifier=force.attack_modifier[rows]), rows
+
+    def transition(self, analyzer: BattleAnalyzer, state_id: int):
+        transition_key = (analyzer.intel_condition.value, analyzer.reaction_player.value, int(analyzer.air_power_mod),
+                          analyzer.allied_ec_mod, analyzer.japan_ec_mod, state_id)
+
+        if transition_key in self.transitions:
+            return self.transitions[transition_key]
+
+        allied_flipped, allied_surviving, japan_flipped, japan_surviving = self.states[state_id]
+
+        allied_force, allied_rows = self.state_force(self.allied_force, allied_flipped, allied_surviving)
+        japan_force, japan_rows = self.state_force(self.japan_force, japan_flipped, japan_surviving)
+
+        allied_forces_cf = allied_force.total_combat_factor()
+        japan_forces_cf = japan_force.total_combat_factor()
+
+        outcomes = []
+
+        if (len(allied_force) == 0) | (len(japan_force) == 0):
+            # No battle is fought once one side has no units left, and the force state doesn't change
+            outcomes.append((1, NO_BATTLE, 0, allied_forces_cf, 0, japan_forces_cf, state_id))
+        else:
+            for class_key, count in analyzer.outcome_class_counts().items():
+                allied_result, allied_critical_hit, japan_result, japan_critical_hit = class_key
+
+                outcome = resolve_outcome(allied_force, japan_force,
+                                          allied_result=allied_result,
+                                          allied_losses=int(math.ceil(japan_forces_cf * japan_result)),
+                                          allied_critical_hit=allied_critical_hit,
+                                          japan_result=japan_result,
+                                          japan_losses=int(math.ceil(allied_forces_cf * allied_result)),
+                                          japan_critical_hit=japan_critical_hit,
+                                          intel_condition=analyzer.intel_condition,
+                                          reaction_player=analyzer.reaction_player)
+
+                # Units flipped by the battle start the next battle flipped, and eliminated units are out of the
+                # campaign
+                next_allied_flipped = allied_flipped.copy()
+                next_allied_flipped[allied_rows] |= allied_force.damage_flipped
+                next_allied_surviving = allied_surviving.copy()
+                next_allied_surviving[allied_rows] &= ~allied_force.damage_eliminated
+
+                next_japan_flipped = japan_flipped.copy()
+                next_japan_flipped[japan_rows] |= japan_force.damage_flipped
+                next_japan_surviving = japan_surviving.copy()
+                next_japan_surviving[japan_rows] &= ~japan_force.damage_eliminated
+
+                outcomes.append((count, PLAYER_CODES[outcome['battle_winner']],
+                                 outcome['allied_damage_applied'], outcome['allied_remaining_cf'],
+                                 outcome['japan_damage_applied'], outcome['japan_remaining_cf'],
+                                 self.state_id(next_allied_flipped, next_allied_surviving, next_japan_flipped,
+                                               next_japan_surviving)))
+
+        counts, battle_winner, allied_damage, allied_cf, japan_damage, japan_cf, next_state = \
+            (np.array(x) for x in zip(*outcomes))
+
+        transition = {
+            'cumulative_probability': np.cumsum(counts) / counts.sum(),
+            'battle_winner': battle_winner,
+            'allied_damage_applied': allied_damage,
+            'allied_remaining_cf': allied_cf,
+            'japan_damage_applied': japan_damage,
+            'japan_remaining_cf': japan_cf,
+            'next_state': next_state
+        }
+
+        self.transitions[transition_key] = transition
+
+        return transition
+
+    def simulate_batch(self, trial_count: int, rng: np.random.Generator):
+        states = np.full(trial_count, self.initial_state)
+
+        results = {column: np.zeros((trial_count, len(self.battles)), dtype=int)
+                   for column in ['battle_winner', 'allied_damage_applied', 'allied_remaining_cf',
+                                  'japan_damage_applied', 'japan_remaining_cf']}
+
+        for battle, analyzer in enumerate(self.battles):
+            # Trials are grouped by force state, and every trial in a group draws its outcome in one vectorized step
+            order = np.argsort(states, kind='stable')
+            state_ids, starts = np.unique(states[order], return_index=True)
+            next_states = np.empty(trial_count, dtype=int)
+
+            for state_id, trials in zip(state_ids.tolist(), np.split(order, starts[1:])):
+                transition = self.transition(analyzer, state_id)
+
+                outcome = np.searchsorted(transition['cumulative_probability'], rng.random(len(trials)), side='right')
+                outcome = np.minimum(outcome, len(transition['next_state']) - 1)
+
+                for column, values in results.items():
+                    values[trials, battle] = transition[column][outcome]
+
+                next_states[trials] = transition['next_state'][outcome]
+
+            states = next_states
+
+        return results
+
+    def run(self, trial_count: int = 100000, batch_size: int = 10000, seed: int = None):
+        rng = np.random.default_rng(seed)
+
+        batches = [self.simulate_batch(min(batch_size, trial_count - start), rng)
+                   for start in range(0, trial_count, batch_size)]
+
+        results = {column: np.concatenate([x[column] for x in batches]) for column in batches[0]}
+
+        return CampaignResult(results, batch_size)
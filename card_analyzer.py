@@ -1,181 +1,147 @@
 import pandas as pd
 import enums
-from bs4 import BeautifulSoup
-import mechanize
-import http.cookiejar as cj
+from acts_session import load_session_manager
+from card_probability import DeckProbability, HAND_SIZES
+from deck_tracker import DeckTracker
+from result_cache import ResultCache
+from unit_catalog import load_catalog
 
 
-def load_card_data(player: enums.Player):
-    file_name = 'data/allied_deck.csv' if player == enums.Player.ALLIES else 'data/japan_deck.csv'
-
-    return pd.read_csv(file_name)
-
-
-def retrieve_discards(user_name, pw, game_name):
-    jar = cj.CookieJar()
-    br = mechanize.Browser()
-    br.set_cookiejar(jar)
-    br.open('http://acts.warhorsesim.com/login.asp')
-    br.select_form(nr=0)
-    br.form['alias'] = user_name
-    br.form['password'] = pw
-    br.submit()
-
-    for link in br.links():
-        if link.url == 'myGames.asp?moduleID=19':
-            print(link)
-            br.follow_link(link)
-            break
-
-    for link in br.links():
-        if link.text == game_name:
-            print(link)
-            br.follow_link(link)
-            break
-
-    for link in br.links():
-        if link.url == 'discardsAll.asp':
-            print(link)
-            br.follow_link(link)
-            break
-
-    soup = BeautifulSoup(br.response().read(), 'html.parser')
-    card_list = []
-
-    table_list = soup.find_all('table', border='0', cellpadding='3', width='100%')
+# The card analyzer is created once per process
+card_analyzer = None
 
-    for i in range(len(table_list)):
-        table = table_list[i]
 
-        for x in table.find_all('td', class_='textcenter', width='10%'):
-            card = {'player_id': i, 'card_id': int(x.text)}
-            card_list.append(card)
-
-    return card_list
-
-
-def deck_attribute_counts(deck_df: pd.DataFrame):
-    result = []
+def load_card_data(player: enums.Player):
+    return load_catalog().card_data(player)
 
-    item = {'attribute': '1 OP', 'count': len(deck_df.loc[deck_df['ops_value'] == 1]), 'probability': 0.0}
-    result.append(item)
 
-    item = {'attribute': '2 OP', 'count': len(deck_df.loc[deck_df['ops_value'] == 2]), 'probability': 0.0}
-    result.append(item)
+def retrieve_discards(user_name, pw, game_name):
+    # Logged in ACTS sessions and recently retrieved discards are reused across calls
+    return load_session_manager().retrieve_discards(user_name, pw, game_name)
 
-    item = {'attribute': '3 OP', 'count': len(deck_df.loc[deck_df['ops_value'] == 3]), 'probability': 0.0}
-    result.append(item)
 
-    item = {'attribute': 'Card Draw', 'count': len(deck_df.loc[deck_df['draw_card'] == 'Y']), 'probability': 0.0}
-    result.append(item)
+def player_discard_ids(player: enums.Player, discard_list):
+    # The Japanese discards are listed first on the ACTS discards page
+    player_id = 1 if player == enums.Player.ALLIES else 0
 
-    item = {'attribute': 'PW', 'count': len(deck_df.loc[deck_df['pw_change'] > 0]), 'probability': 0.0}
-    result.append(item)
+    return [x.get('card_id') for x in discard_list if x.get('player_id') == player_id]
 
-    item = {'attribute': 'ISR Ender', 'count': len(deck_df.loc[deck_df['isr_end'] == 'Y']), 'probability': 0.0}
-    result.append(item)
 
-    item = {'attribute': 'ISR Starter', 'count': len(deck_df.loc[deck_df['isr_start'] == 'Y']), 'probability': 0.0}
-    result.append(item)
+class CardAnalyzer:
+    def __init__(self):
+        self.allied_card_data = load_card_data(enums.Player.ALLIES)
+        self.japan_card_data = load_card_data(enums.Player.JAPAN)
 
-    item = {'attribute': 'Intel Change', 'count': len(deck_df.loc[~deck_df['intel_status'].isna()]), 'probability': 0.0}
-    result.append(item)
+        # The attribute matrix of each deck is built once, and every analysis only masks out the missing cards
+        self.deck_probability = {
+            enums.Player.ALLIES: DeckProbability(self.allied_card_data),
+            enums.Player.JAPAN: DeckProbability(self.japan_card_data)
+        }
 
-    item = {'attribute': 'Logistics 4+', 'count': len(deck_df.loc[deck_df['logistics_value'] > 3]), 'probability': 0.0}
-    result.append(item)
+        self.deck_trackers = ResultCache(max_size=256)
 
-    item = {'attribute': 'WIE', 'count': len(deck_df.loc[~deck_df['wie_level'].isna()]), 'probability': 0.0}
-    result.append(item)
+    def analyze_card_deck(self, user_name, pw, game_name, deck_type: enums.DeckType,
+                          allies_draw_count: int, japan_draw_count: int):
 
-    item = {'attribute': 'Sub', 'count': len(deck_df.loc[deck_df['sub'] > 0]), 'probability': 0.0}
-    result.append(item)
+        discard_list = retrieve_discards(user_name, pw, game_name)
 
-    item = {'attribute': 'Weather', 'count': len(deck_df.loc[deck_df['weather'] == 'Y']), 'probability': 0.0}
-    result.append(item)
+        # The decks are computed from the discards page alone, so every web worker process gives the same result. A
+        # DeckTracker is only kept for a game_key passed to analyze_player_card_deck.
+        result_allies = self.analyze_allies_card_deck(deck_type=deck_type, draw_count=allies_draw_count,
+                                                      discard_list=discard_list)
 
-    item = {'attribute': 'Kamikaze', 'count': len(deck_df.loc[deck_df['kamikaze'] == 'Y']), 'probability': 0.0}
-    result.append(item)
+        result_japan = self.analyze_japan_card_deck(deck_type=deck_type, draw_count=japan_draw_count,
+                                                    discard_list=discard_list)
 
-    return result
+        return [result_allies, result_japan]
 
+    def card_mask(self, player: enums.Player, deck_type: enums.DeckType):
+        deck_df = self.allied_card_data if player == enums.Player.ALLIES else self.japan_card_data
 
-def calculate_probability(deck_count: int, attribute_count: int, draw_count: int):
-    if attribute_count == 0:
-        return 0.0
+        if deck_type == enums.DeckType.SOUTH_PACIFIC:
+            return (deck_df['south_pacific'] == 'Y').to_numpy()
 
-    probability = 1.0
-    for i in range(draw_count):
-        probability *= (1 - (attribute_count / deck_count))
-        deck_count -= 1
+        return None
 
-    return 1 - probability
+    def remaining_cards(self, player: enums.Player, deck_type: enums.DeckType, discard_list):
+        return self.deck_probability[player].in_deck(card_mask=self.card_mask(player, deck_type),
+                                                     discard_ids=player_discard_ids(player, discard_list))
 
+    def deck_tracker(self, player: enums.Player, deck_type: enums.DeckType, game_key):
+        key = (game_key, player, deck_type)
+        tracker = self.deck_trackers.get(key)
 
-class CardAnalyzer:
-    def __init__(self):
-        self.allied_card_data = load_card_data(enums.Player.ALLIES)
-        self.japan_card_data = load_card_data(enums.Player.JAPAN)
+        if tracker is None:
+            deck_df = self.allied_card_data if player == enums.Player.ALLIES else self.japan_card_data
+            tracker = DeckTracker(deck_df, deck_probability=self.deck_probability[player],
+                                  card_mask=self.card_mask(player, deck_type))
+            self.deck_trackers.put(key, tracker)
 
-    def analyze_card_deck(self, user_name, pw, game_name, deck_type: enums.DeckType,
-                          allies_draw_count: int, japan_draw_count: int):
+        return tracker
 
-        discard_list = retrieve_discards(user_name, pw, game_name)
+    def analyze_player_card_deck(self, player: enums.Player, deck_type: enums.DeckType, draw_count: int,
+                                 discard_list, game_key=None):
+        deck_probability = self.deck_probability[player]
 
-        result_allies = self.analyze_allies_card_deck(deck_type=deck_type,
-                                                      draw_count=allies_draw_count, discard_list=discard_list)
+        # A tracked game only applies the discards since its last update
+        if game_key is not None:
+            tracker = self.deck_tracker(player, deck_type, game_key)
 
-        result_japan = self.analyze_japan_card_deck(deck_type=deck_type,
-                                                    draw_count=japan_draw_count, discard_list=discard_list)
+            with tracker.lock:
+                tracker.update(player_discard_ids(player, discard_list))
+                attribute_counts = tracker.attribute_counts.copy()
+                probabilities = tracker.probabilities(draw_counts=[draw_count])
+        else:
+            in_deck = self.remaining_cards(player, deck_type, discard_list)
+            attribute_counts = deck_probability.attribute_counts(in_deck)
+            probabilities = deck_probability.probabilities(draw_counts=[draw_count], in_deck=in_deck)
 
-        return [result_allies, result_japan]
+        result_df = pd.DataFrame(data={
+            'attribute': deck_probability.attribute_names,
+            'count': attribute_counts,
+            'probability': probabilities[:, 0]
+        })
 
-    def analyze_allies_card_deck(self, deck_type: enums.DeckType, draw_count: int, discard_list):
-        deck_df = self.allied_card_data
+        return result_df
 
-        if deck_type == enums.DeckType.SOUTH_PACIFIC:
-            deck_df = deck_df.loc[deck_df['south_pacific'] == 'Y']
+    def hand_size_probabilities(self, player: enums.Player, deck_type: enums.DeckType, discard_list,
+                                draw_counts=None, at_least: int = 1):
+        # Every attribute for every hand size, with one column per hand size
+        draw_counts = HAND_SIZES if draw_counts is None else draw_counts
+        deck_probability = self.deck_probability[player]
+        in_deck = self.remaining_cards(player, deck_type, discard_list)
 
-        discard_ids = []
-        for card in discard_list:
-            if card.get('player_id') == 1:
-                discard_ids.append(card.get('card_id'))
+        probabilities = deck_probability.probabilities(draw_counts=draw_counts, at_least=at_least, in_deck=in_deck)
 
-        deck_df = deck_df.loc[~deck_df['card_id'].isin(discard_ids)]
+        return pd.DataFrame(data=probabilities, index=deck_probability.attribute_names, columns=draw_counts)
 
-        deck_attributes = deck_attribute_counts(deck_df)
+    def joint_probability(self, player: enums.Player, attribute_names: [str], deck_type: enums.DeckType,
+                          discard_list, draw_counts=None):
+        # The probability of a hand holding a card with each of the attributes, e.g. ['3 OP', 'ISR Ender']
+        draw_counts = HAND_SIZES if draw_counts is None else draw_counts
+        in_deck = self.remaining_cards(player, deck_type, discard_list)
 
-        for attribute in deck_attributes:
-            probability = calculate_probability(deck_count=len(deck_df),
-                                                attribute_count=attribute.get('count'), draw_count=draw_count)
+        probabilities = self.deck_probability[player].joint_probability(attribute_names, draw_counts=draw_counts,
+                                                                         in_deck=in_deck)
 
-            attribute.update({'probability': probability})
+        return pd.Series(data=probabilities, index=draw_counts)
 
-        result_df = pd.DataFrame(data=deck_attributes)
+    def analyze_allies_card_deck(self, deck_type: enums.DeckType, draw_count: int, discard_list, game_key=None):
+        result_df = self.analyze_player_card_deck(enums.Player.ALLIES, deck_type, draw_count, discard_list,
+                                                  game_key=game_key)
         result_df = result_df.loc[~result_df['attribute'].isin(['Weather', 'Kamikaze'])]
 
         return result_df
 
-    def analyze_japan_card_deck(self, deck_type: enums.DeckType, draw_count: int, discard_list):
-        deck_df = self.japan_card_data
-
-        if deck_type == enums.DeckType.SOUTH_PACIFIC:
-            deck_df = deck_df.loc[deck_df['south_pacific'] == 'Y']
-
-        discard_ids = []
-        for card in discard_list:
-            if card.get('player_id') == 0:
-                discard_ids.append(card.get('card_id'))
-
-        deck_df = deck_df.loc[~deck_df['card_id'].isin(discard_ids)]
+    def analyze_japan_card_deck(self, deck_type: enums.DeckType, draw_count: int, discard_list, game_key=None):
+        return self.analyze_player_card_deck(enums.Player.JAPAN, deck_type, draw_count, discard_list,
+                                             game_key=game_key)
 
-        deck_attributes = deck_attribute_counts(deck_df)
 
-        for attribute in deck_attributes:
-            probability = calculate_probability(deck_count=len(deck_df),
-                                                attribute_count=attribute.get('count'), draw_count=draw_count)
+def load_card_analyzer():
+    global card_analyzer
 
-            attribute.update({'probability': probability})
+    if card_analyzer is None:
+        card_analyzer = CardAnalyzer()
 
-        result_df = pd.DataFrame(data=deck_attributes)
-
-        return result_df
+    return card_analyzer
@@ -0,0 +1,125 @@
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# The job states are kept in files, one per job, so a job submitted to one web worker process can be polled through any
+# of the others on the host
+JOB_DIR = os.environ.get('CARD_JOB_DIR', os.path.join(tempfile.gettempdir(), 'eots-card-jobs'))
+
+# The job queue is created once per process
+job_queue = None
+
+
+class JobQueue:
+
+    def __init__(self, job_dir: str = JOB_DIR, max_workers: int = 4, max_age: float = 3600.0,
+                 timeout: float = 600.0):
+        # The card analysis jobs wait on remote pages, so threads keep the web workers free at little cost
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='card-job')
+        self.job_dir = job_dir
+        self.max_age = max_age
+        self.timeout = timeout
+
+        os.makedirs(self.job_dir, mode=0o700, exist_ok=True)
+
+        # Another user could change the job results in a directory they own
+        if hasattr(os, 'getuid') and (os.stat(self.job_dir).st_uid != os.getuid()):
+            raise PermissionError(f'The card job directory {self.job_dir} is owned by another user, set '
+                                  f'CARD_JOB_DIR to a directory of the app')
+
+    def __len__(self):
+        return len([x for x in os.listdir(self.job_dir) if x.endswith('.json')])
+
+    def job_file(self, job_id: str):
+        # The job id comes back from the browser, so only ids of the form submit creates name a file
+        if (not isinstance(job_id, str)) or (re.fullmatch('[0-9a-f]{32}', job_id) is None):
+            return None
+
+        return os.path.join(self.job_dir, f'{job_id}.json')
+
+    def submit(self, function, *args, **kwargs):
+        job_id = uuid.uuid4().hex
+
+        self.remove_expired()
+        self.update(job_id, status='pending')
+        self.executor.submit(self.run, job_id, function, args, kwargs)
+
+        return job_id
+
+    def run(self, job_id: str, function, args, kwargs):
+        self.update(job_id, status='running')
+
+        try:
+            self.update(job_id, status='done', result=function(*args, **kwargs))
+        except Exception as e:
+            self.update(job_id, status='failed', error=f'{type(e).__name__}: {e}')
+
+    def update(self, job_id: str, status: str, result=None, error=None):
+        # The file is replaced in one step, so a poll never reads a partly written job. The results are plot traces,
+        # written the way Dash sends them to the browser.
+        from plotly.utils import PlotlyJSONEncoder
+
+        job_file = self.job_file(job_id)
+        temp_file = f'{job_file}.{os.getpid()}.tmp'
+
+        with open(temp_file, 'w') as f:
+            f.write(json.dumps({'status': status, 'result': result, 'error': error, 'updated': time.time()},
+                               cls=PlotlyJSONEncoder))
+
+        os.replace(temp_file, job_file)
+
+    def status(self, job_id: str):
+        # A job that was never submitted, or was already collected, is reported rather than raised
+        unknown = {'status': 'unknown', 'result': None, 'error': None}
+        job_file = self.job_file(job_id)
+
+        if job_file is None:
+            return unknown
+
+        try:
+            with open(job_file) as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return unknown
+
+        # The job of a worker process that stopped while running it never finishes, so it is reported as lost
+        if (job['status'] in ['pending', 'running']) & (time.time() - job['updated'] > self.timeout):
+            return unknown
+
+        return job
+
+    def pop(self, job_id: str):
+        job = self.status(job_id)
+        job_file = self.job_file(job_id)
+
+        if job_file is not None:
+            try:
+                os.remove(job_file)
+            except FileNotFoundError:
+                pass
+
+        return job
+
+    def remove_expired(self):
+        # Forget the jobs whose results were abandoned, or were left behind by a stopped worker process
+        expired_at = time.time() - self.max_age
+
+        for file_name in os.listdir(self.job_dir):
+            try:
+                if os.path.getmtime(os.path.join(self.job_dir, file_name)) < expired_at:
+                    os.remove(os.path.join(self.job_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+
+def load_job_queue():
+    global job_queue
+
+    if job_queue is None:
+        job_queue = JobQueue()
+
+    return job_queue
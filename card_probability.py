@@ -0,0 +1,107 @@
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+HAND_SIZES = [3, 4, 5, 6, 7]
+
+# Each card attribute is a vectorized test over the columns of a deck frame
+CARD_ATTRIBUTES = {
+    '1 OP': lambda deck_df: deck_df['ops_value'] == 1,
+    '2 OP': lambda deck_df: deck_df['ops_value'] == 2,
+    '3 OP': lambda deck_df: deck_df['ops_value'] == 3,
+    'Card Draw': lambda deck_df: deck_df['draw_card'] == 'Y',
+    'PW': lambda deck_df: deck_df['pw_change'] > 0,
+    'ISR Ender': lambda deck_df: deck_df['isr_end'] == 'Y',
+    'ISR Starter': lambda deck_df: deck_df['isr_start'] == 'Y',
+    'Intel Change': lambda deck_df: ~deck_df['intel_status'].isna(),
+    'Logistics 4+': lambda deck_df: deck_df['logistics_value'] > 3,
+    'WIE': lambda deck_df: ~deck_df['wie_level'].isna(),
+    'Sub': lambda deck_df: deck_df['sub'] > 0,
+    'Weather': lambda deck_df: deck_df['weather'] == 'Y',
+    'Kamikaze': lambda deck_df: deck_df['kamikaze'] == 'Y'
+}
+
+
+def comb_table(max_n: int, max_k: int):
+    # Binomial coefficients C(n, k) for every n <= max_n and k <= max_k, built with Pascal's rule. The values stay
+    # exact as floats for decks of this size.
+    table = np.zeros((max_n + 1, max_k + 1))
+    table[:, 0] = 1.0
+
+    for n in range(1, max_n + 1):
+        table[n, 1:] = table[n - 1, 1:] + table[n - 1, :-1]
+
+    return table
+
+
+def hypergeometric_at_least(deck_count: int, success_counts, draw_counts, at_least: int = 1):
+    # P(at least at_least successes) when drawing without replacement from a deck of deck_count cards, with one row
+    # per success count and one column per draw count
+    success_counts = np.asarray(success_counts, dtype=int)
+    draw_counts = np.minimum(np.asarray(draw_counts, dtype=int), deck_count)
+
+    if at_least <= 0:
+        return np.ones((len(success_counts), len(draw_counts)))
+
+    table = comb_table(deck_count, max(int(draw_counts.max(initial=0)), at_least))
+
+    k = success_counts[:, None, None]
+    n = draw_counts[None, :, None]
+    j = np.arange(at_least)[None, None, :]
+
+    # P(exactly j successes) for every j below at_least
+    pmf = table[k, j] * table[deck_count - k, np.maximum(n - j, 0)] * (n >= j) / table[deck_count, n]
+
+    return np.clip(1.0 - pmf.sum(axis=-1), 0.0, 1.0)
+
+
+class DeckProbability:
+
+    def __init__(self, deck_df: pd.DataFrame, attributes: dict = None):
+        attributes = CARD_ATTRIBUTES if attributes is None else attributes
+
+        self.attribute_names = list(attributes)
+        self.attribute_index = {name: i for i, name in enumerate(self.attribute_names)}
+        self.card_ids = deck_df['card_id'].to_numpy()
+
+        # One row per card and one column per attribute, built once per deck
+        self.attribute_matrix = np.column_stack([np.asarray(test(deck_df), dtype=bool)
+                                                 for test in attributes.values()])
+
+    def in_deck(self, card_mask=None, discard_ids=None):
+        # The cards still in the deck, as a boolean mask over the deck rows
+        in_deck = np.ones(len(self.card_ids), dtype=bool) if card_mask is None else np.asarray(card_mask, dtype=bool)
+
+        if discard_ids:
+            in_deck = in_deck & ~np.isin(self.card_ids, list(discard_ids))
+
+        return in_deck
+
+    def attribute_counts(self, in_deck=None):
+        matrix = self.attribute_matrix if in_deck is None else self.attribute_matrix[in_deck]
+
+        return matrix.sum(axis=0)
+
+    def probabilities(self, draw_counts=None, at_least: int = 1, in_deck=None):
+        # P(at least at_least cards with the attribute in the hand), for every attribute (rows) and draw count (columns)
+        draw_counts = HAND_SIZES if draw_counts is None else draw_counts
+        deck_count = len(self.card_ids) if in_deck is None else int(np.count_nonzero(in_deck))
+
+        return hypergeometric_at_least(deck_count, self.attribute_counts(in_deck), draw_counts, at_least=at_least)
+
+    def joint_probability(self, attribute_names: [str], draw_counts=None, in_deck=None):
+        # P(the hand holds a card with each of the attributes), for every draw count. A single card with several of
+        # the attributes counts for each of them. By inclusion-exclusion over the attributes that are missing from the
+        # hand, this is the sum of (-1)^|S| P(no card with any attribute in S) over every subset S.
+        draw_counts = HAND_SIZES if draw_counts is None else draw_counts
+        matrix = self.attribute_matrix if in_deck is None else self.attribute_matrix[in_deck]
+        columns = [self.attribute_index[x] for x in attribute_names]
+
+        subsets = [list(x) for size in range(len(columns) + 1) for x in combinations(columns, size)]
+        signs = np.array([(-1) ** len(x) for x in subsets])
+        union_counts = np.array([np.count_nonzero(matrix[:, x].any(axis=1)) for x in subsets])
+
+        # P(no card with any attribute in S) is the complement of drawing at least one of them
+        none_drawn = 1.0 - hypergeometric_at_least(len(matrix), union_counts, draw_counts)
+
+        return np.clip((signs[:, None] * none_drawn).sum(axis=0), 0.0, 1.0)
@@ -0,0 +1,112 @@
+import numpy as np
+from combat_unit import CombatUnit
+
+
+class CombatForce:
+
+    def __init__(self, combat_units: [CombatUnit], is_flipped: [bool] = None, is_in_battle_hex: [bool] = None,
+                 is_extended_range: [bool] = None, attack_modifier: [int] = None):
+        self.combat_units = list(combat_units)
+
+        # Static unit attributes, shared by every copy of the force
+        self.unit_id = np.array([u.unit_id for u in self.combat_units], dtype=int)
+        self.attack_front = np.array([u.attack_front for u in self.combat_units], dtype=float)
+        self.attack_back = np.array([u.attack_back for u in self.combat_units], dtype=float)
+        self.defense = np.array([u.defense for u in self.combat_units], dtype=int)
+        self.move_range = np.array([u.move_range for u in self.combat_units], dtype=float)
+
+        # Unit state selected by the player, defaults to the state of the CombatUnit objects
+        self.is_flipped = np.array(
+            [u.is_flipped for u in self.combat_units] if is_flipped is None else is_flipped, dtype=bool)
+        self.is_in_battle_hex = np.array(
+            [u.is_in_battle_hex for u in self.combat_units] if is_in_battle_hex is None else is_in_battle_hex,
+            dtype=bool)
+        self.is_extended_range = np.array(
+            [u.is_extended_range for u in self.combat_units] if is_extended_range is None else is_extended_range,
+            dtype=bool)
+        self.attack_modifier = np.array(
+            [u.attack_modifier for u in self.combat_units] if attack_modifier is None else attack_modifier,
+            dtype=int)
+
+        self.is_air_unit = self.move_range > 0
+
+        # The damage allocation order, units with the smallest defense value and largest loss delta first
+        sort_keys = list(zip(self.defense.tolist(), (-self.loss_delta()).tolist()))
+        self.damage_order = sorted(range(len(self.combat_units)), key=sort_keys.__getitem__)
+
+        self.damage_flipped = np.zeros(len(self.combat_units), dtype=bool)
+        self.damage_eliminated = np.zeros(len(self.combat_units), dtype=bool)
+
+    def __len__(self):
+        return len(self.combat_units)
+
+    def reset(self):
+        # Clear any damage applied to the force, so it can be reused for the next battle outcome
+        self.damage_flipped[:] = False
+        self.damage_eliminated[:] = False
+
+    def signature(self):
+        # Hashable description of the force composition and the state of each unit, in the order the units were added,
+        # the same order as the damage state arrays cached against it
+        return tuple(zip(self.unit_id.tolist(), self.is_flipped.tolist(), self.is_extended_range.tolist(),
+                         self.is_in_battle_hex.tolist(), self.attack_modifier.tolist()))
+
+    def damage_state(self):
+        return self.damage_flipped.copy(), self.damage_eliminated.copy()
+
+    def restore_damage_state(self, damage_flipped, damage_eliminated):
+        self.damage_flipped[:] = damage_flipped
+        self.damage_eliminated[:] = damage_eliminated
+
+    def combat_factor(self):
+        combat_factor = np.where(self.is_flipped | self.damage_flipped, self.attack_back, self.attack_front)
+
+        combat_factor = combat_factor + self.attack_modifier
+
+        combat_factor = np.where(self.is_extended_range, np.ceil(combat_factor / 2), combat_factor)
+
+        combat_factor[self.damage_eliminated | (np.isnan(self.move_range) & ~self.is_in_battle_hex)] = 0
+
+        return np.ceil(combat_factor)
+
+    def total_combat_factor(self):
+        return int(self.combat_factor().sum())
+
+    def loss_delta(self):
+        return np.where(self.is_flipped, self.attack_back, self.attack_front - self.attack_back)
+
+    def damage_applied(self):
+        return self.defense * self.damage_flipped + self.defense * self.damage_eliminated
+
+    def total_damage_applied(self):
+        return int(self.damage_applied().sum())
+
+    def air_unit_count(self):
+        return int(self.is_air_unit.sum())
+
+    def surviving_unit_count(self):
+        return int((~self.damage_eliminated).sum())
+
+    def surviving_air_unit_count(self):
+        return int((self.is_air_unit & ~self.damage_eliminated).sum())
+
+
+def as_combat_force(combat_forces):
+    if isinstance(combat_forces, CombatForce):
+        return combat_forces
+
+    combat_forces = list(combat_forces)
+
+    # A force can also be given as a list of unit ids, which are looked up in the unit registry
+    if any(isinstance(x, (int, np.integer)) for x in combat_forces):
+        from unit_registry import load_registry
+
+        unit_registry = load_registry()
+
+        for unit_id in combat_forces:
+            if unit_id not in unit_registry:
+                raise ValueError(f'Unknown unit id {unit_id}')
+
+        combat_forces = unit_registry.get_units(combat_forces)
+
+    return CombatForce(combat_forces)
@@ -0,0 +1,105 @@
+import threading
+import numpy as np
+import pandas as pd
+from card_probability import DeckProbability, HAND_SIZES, hypergeometric_at_least
+
+
+class DeckTracker:
+
+    def __init__(self, deck_df: pd.DataFrame, deck_probability: DeckProbability = None, card_mask=None):
+        self.deck_probability = DeckProbability(deck_df) if deck_probability is None else deck_probability
+        self.card_index = {card_id: row for row, card_id in enumerate(self.deck_probability.card_ids.tolist())}
+
+        # Cards outside the mask, e.g. outside the South Pacific deck, are never in the deck
+        self.in_game = np.ones(len(self.card_index), dtype=bool) if card_mask is None else \
+            np.asarray(card_mask, dtype=bool).copy()
+        self.in_deck = self.in_game.copy()
+
+        # Both the 'Y' and the conditional 'Maybe' reshuffle cards, whose reshuffle shows on the discards page as the
+        # card leaving the discard list. The same goes for the 'Y' and 'Maybe' remove if event played rules.
+        self.reshuffle_cards = deck_df['reshuffle_deck'].isin(['Y', 'Maybe']).to_numpy()
+        self.removable_cards = deck_df['remove_if_event_played'].isin(['Y', 'Maybe']).to_numpy()
+
+        self.discarded = set()
+        self.removed = set()
+        self.last_discards = []
+
+        self.attribute_counts = self.deck_probability.attribute_counts(self.in_deck)
+        self.deck_count = int(np.count_nonzero(self.in_deck))
+
+        self.lock = threading.Lock()
+
+    def take_card(self, row: int):
+        if self.in_deck[row]:
+            self.in_deck[row] = False
+            self.attribute_counts -= self.deck_probability.attribute_matrix[row]
+            self.deck_count -= 1
+
+    def return_card(self, row: int):
+        if (not self.in_deck[row]) & self.in_game[row]:
+            self.in_deck[row] = True
+            self.attribute_counts += self.deck_probability.attribute_matrix[row]
+            self.deck_count += 1
+
+    def discard(self, card_ids: [int]):
+        # A card listed again is back in the game, even when it was taken to be removed
+        for card_id in card_ids:
+            row = self.card_index.get(card_id)
+
+            if row is not None:
+                self.removed.discard(row)
+                self.take_card(row)
+                self.discarded.add(row)
+
+    def remove(self, card_ids: [int]):
+        # Cards taken out of the game for good
+        for card_id in card_ids:
+            row = self.card_index.get(card_id)
+
+            if row is not None:
+                self.take_card(row)
+                self.discarded.discard(row)
+                self.removed.add(row)
+
+    def reshuffle(self):
+        # The discards go back into the deck
+        for row in self.discarded:
+            self.return_card(row)
+
+        self.discarded = set()
+
+    def update(self, discard_ids: [int]):
+        # Applies the changes since the last discard list, which is kept in the order of the discards page. New
+        # discards leave the deck, and cards that are no longer listed have left the discard pile.
+        discard_ids = list(discard_ids)
+        listed = set(discard_ids)
+        last_listed = set(self.last_discards)
+
+        last_rows = [self.card_index[x] for x in self.last_discards if x in self.card_index]
+        left_rows = [self.card_index[x] for x in self.last_discards if (x not in listed) & (x in self.card_index)]
+
+        # The pile was reshuffled when a reshuffle card or every listed card left it. Otherwise the only evidence is
+        # for the cards that are removed if their event is played, and the other cards go back into the deck.
+        reshuffled = (len(left_rows) == len(last_rows)) | any(self.reshuffle_cards[x] for x in left_rows)
+
+        for row in left_rows:
+            if row in self.discarded:
+                self.discarded.discard(row)
+
+                if (not reshuffled) & self.removable_cards[row]:
+                    self.removed.add(row)
+                else:
+                    self.return_card(row)
+
+        self.discard([x for x in discard_ids if x not in last_listed])
+        self.last_discards = discard_ids
+
+        return self
+
+    def probabilities(self, draw_counts=None, at_least: int = 1):
+        draw_counts = HAND_SIZES if draw_counts is None else draw_counts
+
+        return hypergeometric_at_least(self.deck_count, self.attribute_counts, draw_counts, at_least=at_least)
+
+    def joint_probability(self, attribute_names: [str], draw_counts=None):
+        return self.deck_probability.joint_probability(attribute_names, draw_counts=draw_counts, in_deck=self.in_deck)
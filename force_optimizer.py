@@ -0,0 +1,94 @@
+import math
+import enums
+from combat_unit import CombatUnit
+from combat_force import CombatForce
+from battle_analyzer import BattleAnalyzer
+
+
+def dominates(unit: CombatUnit, other_unit: CombatUnit):
+    # A unit dominates another unit when it has the same air capability and is at least as strong in every value
+    # the battle rules use, so the other unit never needs to be committed before it
+    return ((unit.move_range > 0) == (other_unit.move_range > 0)) & \
+        (unit.combat_factor() >= other_unit.combat_factor()) & \
+        (unit.attack_back >= other_unit.attack_back) & \
+        (unit.defense >= other_unit.defense)
+
+
+class ForceOptimizer:
+
+    def __init__(self, opponent_units: [CombatUnit], player: enums.Player = enums.Player.ALLIES,
+                 analyzer: BattleAnalyzer = None):
+        self.player = player
+        self.opponent_force = CombatForce(opponent_units)
+        self.analyzer = BattleAnalyzer() if analyzer is None else analyzer
+        self.evaluation_count = 0
+        self.win_probabilities = {}
+
+    def win_probability(self, units: [CombatUnit]):
+        unit_key = tuple(id(x) for x in units)
+
+        if unit_key not in self.win_probabilities:
+            force = CombatForce(units)
+
+            if self.player == enums.Player.ALLIES:
+                summary = self.analyzer.summarize_battle(force, self.opponent_force)
+            else:
+                summary = self.analyzer.summarize_battle(self.opponent_force, force)
+
+            self.evaluation_count += 1
+            self.win_probabilities[unit_key] = summary.win_probability(self.player)
+
+        return self.win_probabilities[unit_key]
+
+    def find_smallest_force(self, available_units: [CombatUnit], target_probability: float, max_units: int = None):
+        # Strongest units first, so the first forces tried at each size are the most likely to reach the target, and
+        # every unit comes after the units that dominate it
+        candidates = sorted(available_units, key=lambda x: (-x.combat_factor(), -x.defense,
+                                                            -(0 if math.isnan(x.attack_back) else x.attack_back)))
+        max_units = len(candidates) if max_units is None else min(max_units, len(candidates))
+
+        # A dominated unit is only committed together with every unit that dominates it. Identical units dominate
+        # each other, so only the first of them in candidate order counts.
+        dominating_units = [
+            {j for j in range(len(candidates)) if (j != i) & dominates(candidates[j], candidates[i]) &
+             ((j < i) | (not dominates(candidates[i], candidates[j])))}
+            for i in range(len(candidates))]
+
+        if (max_units == 0) | (self.win_probability(candidates) < target_probability):
+            return None, 0.0
+
+        for unit_count in range(1, max_units + 1):
+            selected = self.search(candidates, dominating_units, [], 0, unit_count, target_probability)
+
+            if selected is not None:
+                units = [candidates[i] for i in selected]
+                return units, self.win_probability(units)
+
+        return None, 0.0
+
+    def search(self, candidates: [CombatUnit], dominating_units: [set], selected: [int], start: int,
+               unit_count: int, target_probability: float):
+        if len(selected) == unit_count:
+            if self.win_probability([candidates[i] for i in selected]) >= target_probability:
+                return selected
+
+            return None
+
+        remaining_count = unit_count - len(selected)
+
+        # Upper bound for this branch, assuming that committing another unit never lowers the win probability: the win
+        # probability when every unit still available is committed as well
+        if (remaining_count > len(candidates) - start) | \
+                (self.win_probability([candidates[i] for i in selected] + candidates[start:]) < target_probability):
+            return None
+
+        for i in range(start, len(candidates)):
+            if not dominating_units[i].issubset(selected):
+                continue
+
+            result = self.search(candidates, dominating_units, selected + [i], i + 1, unit_count, target_probability)
+
+            if result is not None:
+                return result
+
+        return None
@@ -1,28 +1,26 @@
+import copy
 import pandas as pd
 from pprint import pprint
-from IPython.display import display
-from combat_unit import CombatUnit
+from unit_registry import load_registry
 from battle_analyzer import BattleAnalyzer
 from battle_analyzer import apply_damage
 import enums
 
 
 def print_hi():
-    units = pd.read_csv('data/unit_data.csv')
-    units['unit_id'] = units.index
+    from IPython.display import display
 
-    an_units = units.loc[units['unit_type'] != 'Ground']
+    unit_registry = load_registry()
+    an_unit_types = [enums.UnitType.AIR, enums.UnitType.NAVAL]
 
-    allied_units = an_units.loc[an_units['nationality'] != 'Japan']
-    japan_units = an_units.loc[an_units['nationality'] == 'Japan']
+    allied_unit_list = unit_registry.find(player=enums.Player.ALLIES, unit_type=an_unit_types)
+    japan_unit_list = unit_registry.find(player=enums.Player.JAPAN, unit_type=an_unit_types)
 
-    allied_unit_list = [CombatUnit(**kwargs) for kwargs in allied_units.to_dict(orient='records')]
-    japan_unit_list = [CombatUnit(**kwargs) for kwargs in japan_units.to_dict(orient='records')]
-
-    allied_forces = allied_unit_list[50:55]
+    # The registry units are shared by the whole process, so the units are copied before they are flipped
+    allied_forces = [copy.copy(x) for x in allied_unit_list[50:55]]
     allied_forces[0].is_flipped = True
 
-    japan_forces = japan_unit_list[23:28]
+    japan_forces = [copy.copy(x) for x in japan_unit_list[23:28]]
     japan_forces[3].is_flipped = True
 
     allied_forces.sort(key=lambda x: (-x.loss_delta(), x.defense))
@@ -0,0 +1,163 @@
+import numpy as np
+import plotly.graph_objs as go
+import enums
+from battle_summary import BattleSummary
+
+# The static part of each figure, its layout and trace styles, is built once per process and sent with the page layout.
+# Callbacks only send the trace arrays, which eots.update_figure in assets/figures.js merges into the figure.
+figures = None
+
+
+def percent_labels(values):
+    # Bar labels as whole percentages, the same as '{0:.0f}%'.format(value * 100)
+    return np.char.add(np.round(np.asarray(values, dtype=float) * 100).astype(int).astype(str), '%')
+
+
+def figure_json(traces: list, layout: go.Layout):
+    return {'data': [x.to_plotly_json() for x in traces], 'layout': layout.to_plotly_json()}
+
+
+def card_analysis_layout(player: enums.Player):
+    return go.Layout(
+        paper_bgcolor='#27293d',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(type='category', title='Card Attribute'),
+        yaxis=dict(range=[0, 1], tickformat=".0%", title='Probability of Drawing 1+ Cards w/ Attribute'),
+        font=dict(color='white'),
+        title=f'{player.name} Hand Analysis',
+        transition={'duration': 500, 'easing': 'cubic-in-out'},
+    )
+
+
+def build_figures():
+    expected_winner = figure_json(
+        [go.Bar(name='Expected Battle Outcome', marker=dict(color='lightgreen'))],
+        go.Layout(
+            paper_bgcolor='#27293d',
+            plot_bgcolor='rgba(0,0,0,0)',
+            xaxis=dict(type='category', title='Battle Winner'),
+            yaxis=dict(range=[0, 1], tickformat=".0%", title='Outcome Probability'),
+            font=dict(color='white'),
+            title='Expected Battle Outcome',
+            transition={'duration': 500, 'easing': 'cubic-in-out'},
+        ))
+
+    expected_losses = figure_json(
+        [go.Bar(offsetgroup=0, name=enums.Player.ALLIES.name, marker=dict(color='lightgreen')),
+         go.Bar(offsetgroup=1, name=enums.Player.JAPAN.name, marker=dict(color='lightblue'))],
+        go.Layout(
+            paper_bgcolor='#27293d',
+            plot_bgcolor='rgba(0,0,0,0)',
+            xaxis=dict(type='category', title='Battle Losses'),
+            yaxis=dict(range=[0, 1], tickformat=".0%", title='Loss Probability'),
+            font=dict(color='white'),
+            title=dict(text='Expected Battle Losses', x=0.5),
+            transition={'duration': 500, 'easing': 'cubic-in-out'},
+        ))
+
+    modifier_sweep = figure_json(
+        [go.Heatmap(zmin=0, zmax=1, colorscale='RdBu', colorbar=dict(title='Allied Win', tickformat='.0%'),
+                    hovertemplate='%{y}<br>%{x}<br>Allied Win: %{z:.0%}<extra></extra>')],
+        go.Layout(
+            paper_bgcolor='#27293d',
+            plot_bgcolor='rgba(0,0,0,0)',
+            xaxis=dict(type='category', title='Allied Air Power DRM, Allied/Japan EC Modifiers'),
+            yaxis=dict(type='category', title='Intelligence Condition / Reaction Player'),
+            font=dict(color='white'),
+            title='Allied Win Probability by Modifier',
+        ))
+
+    card_analysis = {player: figure_json([go.Bar(name='Card Attribute Probability', marker=dict(color='lightgreen'))],
+                                         card_analysis_layout(player))
+                     for player in [enums.Player.ALLIES, enums.Player.JAPAN]}
+
+    # Keyed by the id of the graph that shows the figure
+    return {
+        'expected-winner': expected_winner,
+        'expected-losses': expected_losses,
+        'modifier-sweep': modifier_sweep,
+        'allied-probability': card_analysis[enums.Player.ALLIES],
+        'japan-probability': card_analysis[enums.Player.JAPAN]
+    }
+
+
+def load_figures():
+    global figures
+
+    if figures is None:
+        figures = build_figures()
+
+    return figures
+
+
+def merge_traces(figure: dict, traces: list):
+    # The server side version of eots.update_figure
+    return {'data': [dict(x, **y) for x, y in zip(figure['data'], traces)], 'layout': figure['layout']}
+
+
+def expected_winner_traces(battle_summary: BattleSummary):
+    players = np.array([enums.Player.ALLIES.name, enums.Player.JAPAN.name])
+    win_probability = np.array([battle_summary.win_probability(enums.Player[x]) for x in players])
+
+    shown = win_probability > 0
+
+    return [{'x': players[shown], 'y': win_probability[shown], 'text': percent_labels(win_probability[shown])}]
+
+
+def expected_losses_traces(battle_summary: BattleSummary):
+    allied_damage_values, allied_probability = battle_summary.loss_distribution(enums.Player.ALLIES)
+    japan_damage_values, japan_probability = battle_summary.loss_distribution(enums.Player.JAPAN)
+
+    # Both players share the same damage values on the x axis, with a zero probability where a value can't occur
+    x_values = np.union1d(allied_damage_values, japan_damage_values)
+
+    y_allies = np.zeros(len(x_values))
+    y_allies[np.searchsorted(x_values, allied_damage_values)] = allied_probability
+
+    y_japan = np.zeros(len(x_values))
+    y_japan[np.searchsorted(x_values, japan_damage_values)] = japan_probability
+
+    return [{'x': x_values, 'y': y_allies, 'text': percent_labels(y_allies)},
+            {'x': x_values, 'y': y_japan, 'text': percent_labels(y_japan)}]
+
+
+def modifier_sweep_traces(df_sweep):
+    df_allies = df_sweep.loc[df_sweep['player'] == enums.Player.ALLIES.name]
+
+    x = 'AP +' + df_allies['air_power_mod'].astype(str) + ', EC ' + \
+        df_allies['allied_ec_mod'].map('{0:+d}'.format) + '/' + df_allies['japan_ec_mod'].map('{0:+d}'.format)
+    y = df_allies['intel_condition'] + ' / ' + df_allies['reaction_player'] + ' React'
+
+    # Each label is sent once, with the win probabilities as a matrix of rows by columns. The labels keep the order
+    # they first appear in, as plotly orders the categories of the per cell form.
+    x_codes, x_labels = x.factorize()
+    y_codes, y_labels = y.factorize()
+
+    z = np.full((len(y_labels), len(x_labels)), np.nan)
+    z[y_codes, x_codes] = df_allies['win_probability'].to_numpy()
+
+    return [{'x': np.asarray(x_labels), 'y': np.asarray(y_labels), 'z': z}]
+
+
+def card_analysis_traces(df_results):
+    y = df_results['probability'].to_numpy()
+
+    return [{'x': df_results['attribute'].to_numpy(), 'y': y, 'text': percent_labels(y)}]
+
+
+def plot_expected_winner(battle_summary: BattleSummary):
+    return merge_traces(load_figures()['expected-winner'], expected_winner_traces(battle_summary))
+
+
+def plot_expected_losses(battle_summary: BattleSummary):
+    return merge_traces(load_figures()['expected-losses'], expected_losses_traces(battle_summary))
+
+
+def plot_modifier_sweep(df_sweep):
+    return merge_traces(load_figures()['modifier-sweep'], modifier_sweep_traces(df_sweep))
+
+
+def plot_card_analysis(df_results, player: enums.Player):
+    graph_id = 'allied-probability' if player == enums.Player.ALLIES else 'japan-probability'
+
+    return merge_traces(load_figures()[graph_id], card_analysis_traces(df_results))
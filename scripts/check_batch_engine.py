@@ -0,0 +1,63 @@
+import argparse
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+import enums
+from batch_engine import summarize_battles, summary_columns
+from battle_analyzer import BattleAnalyzer
+from combat_force import CombatForce
+from unit_registry import load_registry
+
+
+def random_force(rng: random.Random, units: list):
+    selected = rng.sample(units, rng.choice([1, 2, 3, 5, 8, 12, 20]))
+
+    return CombatForce(selected, is_flipped=[rng.random() < 0.3 for _ in selected],
+                       is_in_battle_hex=[rng.random() < 0.8 for _ in selected],
+                       is_extended_range=[rng.random() < 0.15 for _ in selected],
+                       attack_modifier=[rng.choice([0, 0, 0, -2, -1, 1, 2]) for _ in selected])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the batched engine against BattleAnalyzer.summarize_battle')
+    parser.add_argument('--scenarios', type=int, default=2000, help='Number of random scenarios to check')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the random scenarios')
+    args = parser.parse_args()
+
+    unit_registry = load_registry()
+    rng = random.Random(args.seed)
+
+    # Air and Naval units with a back side, so every random scenario can be summarized
+    unit_types = [enums.UnitType.AIR, enums.UnitType.NAVAL]
+    player_units = [[x for x in unit_registry.find(player=player, unit_type=unit_types)
+                     if not math.isnan(x.attack_back)] for player in [enums.Player.ALLIES, enums.Player.JAPAN]]
+
+    scenarios = [(random_force(rng, player_units[0]), random_force(rng, player_units[1]),
+                  BattleAnalyzer(intel_condition=rng.choice(list(enums.IntelCondition)),
+                                 reaction_player=rng.choice([enums.Player.ALLIES, enums.Player.JAPAN]),
+                                 air_power_mod=rng.choice(list(enums.AirPowerModifier)),
+                                 allied_ec_mod=rng.randint(-2, 2), japan_ec_mod=rng.randint(-2, 2)))
+                 for _ in range(args.scenarios)]
+
+    batch_results = summarize_battles(scenarios)
+
+    mismatches = []
+
+    for i, (allied_force, japan_force, analyzer) in enumerate(scenarios):
+        for column, value in summary_columns(analyzer.summarize_battle(allied_force, japan_force)).items():
+            if not np.isclose(batch_results[column][i], value, rtol=1e-12, atol=1e-12):
+                mismatches.append(f'scenario {i} {column}: serial {value}, batch {batch_results[column][i]}')
+
+    if len(mismatches) > 0:
+        print(f'{len(mismatches)} mismatches:\n  ' + '\n  '.join(mismatches[:20]))
+        sys.exit(1)
+
+    print(f'The batched engine matches summarize_battle on {len(scenarios)} scenarios')
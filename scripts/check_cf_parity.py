@@ -0,0 +1,112 @@
+import argparse
+import copy
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from combat_force import CombatForce
+from unit_registry import load_registry
+
+COMBAT_FACTOR_JS = os.path.join(ROOT_DIR, 'assets', 'combat_factor.js')
+
+MODIFIERS = [-2, -1, 0, 1, 2, None]
+
+# Runs the clientside CF functions on the cases read from stdin, and writes the results to stdout
+NODE_SCRIPT = '''
+const fs = require('fs');
+global.window = {dash_clientside: {no_update: {}}};
+eval(fs.readFileSync(process.argv[1], 'utf8'));
+const eots = window.dash_clientside.eots;
+const cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+const unitResults = cases.units.map(x => {
+    const label = eots.unit_cf(x[1], x[2], x[3], x[4], {index: x[0]}, cases.stats);
+    return label === window.dash_clientside.no_update ? NaN : Number(label.props.children.match(/-?[0-9]+/)[0]);
+});
+const forceResults = cases.forces.map(x => {
+    const forceState = {unit_ids: x[0], is_flipped: x[1], is_in_battle_hex: x[2], is_extended_range: x[3],
+        attack_modifier: x[4]};
+    const label = eots.allied_total_cf(forceState, cases.stats);
+    return label === window.dash_clientside.no_update ? NaN :
+        Number(label.props.children[1].props.children.match(/-?[0-9]+/)[0]);
+});
+process.stdout.write(JSON.stringify({units: unitResults.map(x => isNaN(x) ? null : x),
+    forces: forceResults.map(x => isNaN(x) ? null : x)}));
+'''
+
+
+def server_unit_combat_factor(unit, is_flipped, is_battle_hex, is_extended, modifier):
+    # The server version of the per unit CF label, None where it raises
+    unit_copy = copy.deepcopy(unit)
+    unit_copy.is_flipped = is_flipped
+    unit_copy.is_in_battle_hex = is_battle_hex
+    unit_copy.is_extended_range = is_extended
+    unit_copy.attack_modifier = modifier
+
+    try:
+        return unit_copy.combat_factor()
+    except (TypeError, ValueError):
+        return None
+
+
+def server_force_combat_factor(units, is_flipped, is_battle_hex, is_extended, modifier):
+    try:
+        return CombatForce(units, is_flipped=is_flipped, is_in_battle_hex=is_battle_hex,
+                           is_extended_range=is_extended, attack_modifier=modifier).total_combat_factor()
+    except (TypeError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the clientside CF functions against the server versions')
+    parser.add_argument('--forces', type=int, default=2000, help='Number of random forces to check')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the random forces')
+    args = parser.parse_args()
+
+    unit_registry = load_registry()
+    rng = random.Random(args.seed)
+
+    # Every unit in every state, and random forces in random states
+    unit_cases = [[unit.unit_id, is_flipped, is_battle_hex, is_extended, modifier]
+                  for unit in unit_registry.units
+                  for is_flipped, is_battle_hex, is_extended in itertools.product([False, True], repeat=3)
+                  for modifier in MODIFIERS]
+
+    force_cases = []
+    for _ in range(args.forces):
+        units = rng.sample(unit_registry.units, rng.randint(1, 12))
+        force_cases.append([[x.unit_id for x in units], [rng.random() < 0.3 for _ in units],
+                            [rng.random() < 0.5 for _ in units], [rng.random() < 0.2 for _ in units],
+                            [rng.choice(MODIFIERS[:-1]) for _ in units]])
+
+    cases = {'stats': unit_registry.combat_stats(), 'units': unit_cases, 'forces': force_cases}
+
+    output = subprocess.run(['node', '-e', NODE_SCRIPT, COMBAT_FACTOR_JS], input=json.dumps(cases),
+                            capture_output=True, text=True, check=True).stdout
+    client_results = json.loads(output)
+
+    mismatches = []
+
+    for case, client_result in zip(unit_cases, client_results['units']):
+        server_result = server_unit_combat_factor(unit_registry.get(case[0]), *case[1:])
+
+        if server_result != client_result:
+            mismatches.append(f'unit {case}: server {server_result}, client {client_result}')
+
+    for case, client_result in zip(force_cases, client_results['forces']):
+        server_result = server_force_combat_factor(unit_registry.get_units(case[0]), *case[1:])
+
+        if server_result != client_result:
+            mismatches.append(f'force {case}: server {server_result}, client {client_result}')
+
+    if len(mismatches) > 0:
+        print(f'{len(mismatches)} mismatches:\n  ' + '\n  '.join(mismatches[:20]))
+        sys.exit(1)
+
+    print(f'The clientside CF matches the server on {len(unit_cases)} unit states and {len(force_cases)} forces')
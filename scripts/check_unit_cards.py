@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+
+import plotly
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from app import allied_unit_list, japan_unit_list, unit_card, unit_registry
+from sprite_atlas import load_sprite_manifest, sprite_style
+
+ASSET_FILES = [os.path.join(ROOT_DIR, 'assets', x) for x in ['combat_factor.js', 'force_state.js']]
+
+# Renders the card and both sides of every unit, and replays the selection changes read from stdin through eots.unit_cards
+NODE_SCRIPT = '''
+const fs = require('fs');
+global.window = {dash_clientside: {no_update: {}}};
+process.argv.slice(1).forEach(x => eval(fs.readFileSync(x, 'utf8')));
+const eots = window.dash_clientside.eots;
+const cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+const cards = cases.units.map(x => eots.unit_card(x[0], x[1], cases.stats, cases.cards, cases.sprites));
+const images = cases.units.map(x => [false, true].map(
+    isFlipped => eots.unit_image(isFlipped, {index: x[1]}, cases.cards, cases.sprites)));
+let children = [];
+const selections = cases.selections.map(value => {
+    const result = eots.unit_cards('allied', value, children, cases.stats, cases.cards, cases.sprites);
+    children = result === window.dash_clientside.no_update ? children : result;
+    return children.map(x => x.props.id.index);
+});
+process.stdout.write(JSON.stringify({cards: cards, images: images, selections: selections}));
+'''
+
+
+def component_json(component):
+    return json.loads(json.dumps(component, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check the clientside unit cards against the server versions')
+    parser.add_argument('--selections', type=int, default=500, help='Number of random selection changes to replay')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the random selection changes')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    unit_cases = [[player_prefix, unit.unit_id] for player_prefix, units in [('allied', allied_unit_list),
+                                                                             ('japan', japan_unit_list)]
+                  for unit in units]
+
+    # Each selection change adds or removes a unit, as the dropdown does
+    selections = []
+    selected = []
+    for _ in range(args.selections):
+        if (len(selected) >= 20) | ((len(selected) > 0) & (rng.random() < 0.4)):
+            removed_unit_id = rng.choice(selected)
+            selected = [x for x in selected if x != removed_unit_id]
+        else:
+            selected = selected + [rng.choice([x.unit_id for x in allied_unit_list if x.unit_id not in selected])]
+
+        selections.append(list(selected))
+
+    cases = {'stats': unit_registry.combat_stats(), 'cards': unit_registry.card_stats(),
+             'sprites': load_sprite_manifest(), 'units': unit_cases, 'selections': selections}
+
+    # The stores are serialized the way Dash sends them to the browser
+    output = subprocess.run(['node', '-e', NODE_SCRIPT] + ASSET_FILES,
+                            input=json.dumps(cases, cls=plotly.utils.PlotlyJSONEncoder), capture_output=True,
+                            text=True, check=True).stdout
+    client_results = json.loads(output)
+
+    mismatches = []
+
+    for (player_prefix, unit_id), client_card in zip(unit_cases, client_results['cards']):
+        if component_json(unit_card(player_prefix, unit_registry.get(unit_id))) != client_card:
+            mismatches.append(f'{player_prefix} unit {unit_id}: the card differs from unit_card')
+
+    for (player_prefix, unit_id), client_images in zip(unit_cases, client_results['images']):
+        unit = unit_registry.get(unit_id)
+
+        if [sprite_style(unit.image_name_front), sprite_style(unit.image_name_back)] != client_images:
+            mismatches.append(f'{player_prefix} unit {unit_id}: the image styles differ from sprite_style')
+
+    # The cards are kept in selection order, as the force state store and the server callbacks expect
+    for i, (value, card_ids) in enumerate(zip(selections, client_results['selections'])):
+        if card_ids != value:
+            mismatches.append(f'selection {i} {value}: cards {card_ids}')
+
+    if len(mismatches) > 0:
+        print(f'{len(mismatches)} mismatches:\n  ' + '\n  '.join(mismatches[:20]))
+        sys.exit(1)
+
+    print(f'The clientside unit cards match unit_card for {len(unit_cases)} units and {len(selections)} selection '
+          f'changes')
@@ -0,0 +1,148 @@
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+
+IMAGE_DIR = os.path.join('assets', 'static', 'images')
+SPRITE_DIR = os.path.join('assets', 'static', 'sprites')
+MANIFEST_FILE = os.path.join(SPRITE_DIR, 'units.json')
+
+# The URL path the atlas is served under, its file name carries a hash of its content
+SPRITE_URL = 'assets/static/sprites'
+
+# The sprite manifest is read once per process
+manifest = None
+
+
+def unit_image_names(unit_file: str = 'data/unit_data.csv'):
+    # pandas is only needed to build the atlas, serving it only reads the manifest
+    import pandas as pd
+
+    # Only the Air and Naval units are shown by the app
+    units = pd.read_csv(unit_file)
+    an_units = units.loc[units['unit_type'] != 'Ground']
+
+    image_names = pd.concat([an_units['image_name_front'], an_units['image_name_back']]).dropna()
+
+    return sorted(set(image_names))
+
+
+def find_image_file(image_name: str, image_files: dict):
+    # Some image names in the unit data differ from the file names only in case
+    if os.path.exists(os.path.join(IMAGE_DIR, image_name)):
+        return os.path.join(IMAGE_DIR, image_name)
+
+    file_name = image_files.get(image_name.lower())
+
+    return None if file_name is None else os.path.join(IMAGE_DIR, file_name)
+
+
+def build_atlas(image_names: [str], columns: int = 16):
+    # Pillow is only needed to build the atlas, not to serve it, and is installed from requirements-build.txt
+    from PIL import Image
+
+    image_files = {x.lower(): x for x in os.listdir(IMAGE_DIR)}
+
+    images = {}
+    missing = []
+
+    for image_name in image_names:
+        image_file = find_image_file(image_name, image_files)
+
+        if image_file is None:
+            missing.append(image_name)
+        else:
+            images[image_name] = Image.open(image_file).convert('RGBA')
+
+    # Every image gets a cell the size of the largest image, in a fixed number of columns
+    cell_width = max(x.width for x in images.values())
+    cell_height = max(x.height for x in images.values())
+    rows = math.ceil(len(images) / columns)
+
+    atlas = Image.new('RGBA', (columns * cell_width, rows * cell_height), (0, 0, 0, 0))
+    positions = {}
+
+    for i, (image_name, image) in enumerate(images.items()):
+        x, y = (i % columns) * cell_width, (i // columns) * cell_height
+        atlas.paste(image, (x, y))
+        positions[image_name] = [x, y, image.width, image.height]
+
+    # The unit images are GIFs of up to 256 colours each, and a shared 256 colour palette keeps them looking the same
+    # at a fraction of the size of a full colour atlas
+    buffer = io.BytesIO()
+    atlas.quantize(256, method=Image.FASTOCTREE).save(buffer, format='PNG', optimize=True)
+
+    return buffer.getvalue(), positions, missing
+
+
+def write_atlas(atlas: bytes, positions: dict):
+    os.makedirs(SPRITE_DIR, exist_ok=True)
+
+    atlas_name = f'units.{hashlib.sha256(atlas).hexdigest()[:12]}.png'
+
+    # Atlases of earlier builds are removed, since the manifest only points at the new one
+    for file_name in os.listdir(SPRITE_DIR):
+        if file_name.startswith('units.') & file_name.endswith('.png') & (file_name != atlas_name):
+            os.remove(os.path.join(SPRITE_DIR, file_name))
+
+    with open(os.path.join(SPRITE_DIR, atlas_name), 'wb') as f:
+        f.write(atlas)
+
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump({'atlas': atlas_name, 'images': positions}, f, indent=1, sort_keys=True)
+
+    return atlas_name
+
+
+def load_sprite_manifest():
+    global manifest
+
+    if manifest is None:
+        with open(MANIFEST_FILE) as f:
+            manifest = json.load(f)
+
+        manifest['url'] = f'{SPRITE_URL}/{manifest["atlas"]}'
+
+    return manifest
+
+
+def is_hashed_asset(path: str):
+    # Hashed files never change, so they can be cached by the browser for good
+    return path.startswith(f'/{SPRITE_URL}/units.') & path.endswith('.png')
+
+
+def sprite_style(image_name: str):
+    # The style that shows one image of the atlas, images missing from the atlas are loaded on their own
+    sprites = load_sprite_manifest()
+    position = sprites['images'].get(image_name)
+
+    if position is None:
+        return {'backgroundImage': f'url(assets/static/images/{image_name})', 'display': 'inline-block',
+                'width': '65px', 'height': '65px'}
+
+    return {'backgroundImage': f'url({sprites["url"]})', 'backgroundPosition': f'-{position[0]}px -{position[1]}px',
+            'display': 'inline-block', 'width': f'{position[2]}px', 'height': f'{position[3]}px'}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack the unit images into a sprite atlas')
+    parser.add_argument('--columns', type=int, default=16, help='Number of images per atlas row')
+    args = parser.parse_args()
+
+    atlas_data, image_positions, missing_images = build_atlas(unit_image_names(), columns=args.columns)
+    atlas_file = write_atlas(atlas_data, image_positions)
+
+    # The atlas replaces the separate image files, so it should take fewer bytes than they do
+    image_files = {x.lower(): x for x in os.listdir(IMAGE_DIR)}
+    images_size = sum(os.path.getsize(find_image_file(x, image_files)) for x in image_positions)
+
+    print(f'Packed {len(image_positions)} unit images of {images_size // 1024} KB into {atlas_file} '
+          f'({len(atlas_data) // 1024} KB)')
+
+    if len(atlas_data) >= images_size:
+        print('The atlas is larger than the images it replaces')
+
+    if len(missing_images) > 0:
+        print(f'No image file for: {", ".join(missing_images)}')
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import pickle
+import numpy as np
+import enums
+from combat_unit import CombatUnit
+
+CATALOG_VERSION = 2
+
+UNIT_DATA_FILE = 'data/unit_data.csv'
+ALLIED_DECK_FILE = 'data/allied_deck.csv'
+JAPAN_DECK_FILE = 'data/japan_deck.csv'
+SNAPSHOT_FILE = 'data/catalog.pkl'
+
+UNIT_COLUMN_TYPES = {
+    'nationality': object,
+    'unit_type': object,
+    'branch': object,
+    'attack_front': int,
+    'defense': int,
+    'attack_back': float,
+    'move_range': float,
+    'move_range_extended': float,
+    'extended_limit': object,
+    'unit_name': object,
+    'image_name_front': object,
+    'image_name_back': object,
+    'unit_id': int
+}
+
+# The catalog is loaded once per process
+catalog = None
+
+
+def source_checksum():
+    checksum = hashlib.sha256()
+
+    for file_name in [UNIT_DATA_FILE, ALLIED_DECK_FILE, JAPAN_DECK_FILE]:
+        with open(file_name, 'rb') as f:
+            checksum.update(f.read())
+
+    return checksum.hexdigest()
+
+
+class UnitCatalog:
+
+    def __init__(self, units: dict, allied_deck: dict, japan_deck: dict):
+        # units holds one typed NumPy array per unit_data.csv column, plus the unit_id column. The decks are held the
+        # same way, so that loading the units for a battle does not need pandas.
+        self.units = units
+        self.allied_deck = allied_deck
+        self.japan_deck = japan_deck
+        self.card_frames = {}
+
+        self.unit_index = {unit_id: row for row, unit_id in enumerate(self.units['unit_id'].tolist())}
+
+    @classmethod
+    def from_source(cls):
+        import pandas as pd
+
+        units = pd.read_csv(UNIT_DATA_FILE)
+        units['unit_id'] = units.index
+
+        unit_columns = {column: units[column].to_numpy(dtype=dtype) for column, dtype in UNIT_COLUMN_TYPES.items()}
+
+        allied_deck = pd.read_csv(ALLIED_DECK_FILE)
+        japan_deck = pd.read_csv(JAPAN_DECK_FILE)
+
+        return cls(unit_columns, {column: allied_deck[column].to_numpy() for column in allied_deck.columns},
+                   {column: japan_deck[column].to_numpy() for column in japan_deck.columns})
+
+    def __len__(self):
+        return len(self.unit_index)
+
+    def unit_record(self, unit_id: int):
+        row = self.unit_index[unit_id]
+
+        return {column: values[row].item() if isinstance(values[row], np.generic) else values[row]
+                for column, values in self.units.items()}
+
+    def combat_unit(self, unit_id: int):
+        return CombatUnit(**self.unit_record(unit_id))
+
+    def combat_units(self, unit_ids: [int] = None):
+        unit_ids = self.units['unit_id'].tolist() if unit_ids is None else unit_ids
+
+        return [self.combat_unit(x) for x in unit_ids]
+
+    def card_data(self, player: enums.Player):
+        if player not in self.card_frames:
+            import pandas as pd
+
+            deck = self.allied_deck if player == enums.Player.ALLIES else self.japan_deck
+            self.card_frames[player] = pd.DataFrame(data=deck)
+
+        return self.card_frames[player]
+
+
+def load_catalog():
+    global catalog
+
+    if catalog is not None:
+        return catalog
+
+    checksum = source_checksum()
+
+    # Reuse the snapshot from a previous start if it was built from the same version of the source files
+    try:
+        with open(SNAPSHOT_FILE, 'rb') as f:
+            snapshot = pickle.load(f)
+
+        if (snapshot.get('version') == CATALOG_VERSION) & (snapshot.get('checksum') == checksum):
+            catalog = UnitCatalog(snapshot['units'], snapshot['allied_deck'], snapshot['japan_deck'])
+            return catalog
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+        pass
+
+    catalog = UnitCatalog.from_source()
+
+    snapshot = {
+        'version': CATALOG_VERSION,
+        'checksum': checksum,
+        'units': catalog.units,
+        'allied_deck': catalog.allied_deck,
+        'japan_deck': catalog.japan_deck
+    }
+
+    try:
+        temp_file = f'{SNAPSHOT_FILE}.{os.getpid()}.tmp'
+
+        with open(temp_file, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temp_file, SNAPSHOT_FILE)
+    except OSError:
+        # The snapshot is only a start up optimization, so a read only data directory is fine
+        pass
+
+    return catalog
@@ -0,0 +1,79 @@
+import math
+from combat_unit import CombatUnit
+from unit_catalog import load_catalog
+
+# The registry of every unit in the catalog is built once per process
+registry = None
+
+
+class UnitRegistry:
+
+    def __init__(self, combat_units: [CombatUnit]):
+        self.units = sorted(combat_units, key=lambda x: x.unit_id)
+
+        self.by_unit_id = {x.unit_id: x for x in self.units}
+        self.row_index = {x.unit_id: row for row, x in enumerate(self.units)}
+
+        # Unit ids for each value of the unit attributes used to filter units, in unit_id order
+        self.indexes = {'nationality': {}, 'unit_type': {}, 'branch': {}, 'player': {}}
+
+        for unit in self.units:
+            for attribute, index in self.indexes.items():
+                index.setdefault(getattr(unit, attribute), []).append(unit.unit_id)
+
+    def __len__(self):
+        return len(self.units)
+
+    def __contains__(self, unit_id: int):
+        return unit_id in self.by_unit_id
+
+    def get(self, unit_id: int):
+        return self.by_unit_id.get(unit_id)
+
+    def get_units(self, unit_ids: [int]):
+        return [self.by_unit_id.get(x) for x in unit_ids]
+
+    def combat_stats(self):
+        # The unit values the Combat Factor rules need, as a compact table keyed by unit id for the browser:
+        # [attack_front, attack_back, is_naval], with None for a missing back side
+        return {unit.unit_id: [unit.attack_front, None if math.isnan(unit.attack_back) else unit.attack_back,
+                               int(math.isnan(unit.move_range))] for unit in self.units}
+
+    def card_stats(self):
+        # The unit values the browser needs to render a unit card: [image_name_front, image_name_back,
+        # has_extended_range, is_in_battle_hex]
+        return {unit.unit_id: [unit.image_name_front, unit.image_name_back,
+                               int(not math.isnan(unit.move_range_extended)), int(unit.is_in_battle_hex)]
+                for unit in self.units}
+
+    def find(self, nationality=None, unit_type=None, branch=None, player=None):
+        # Each filter is either a single value or a list of values, and the units matching every filter are returned
+        unit_ids = None
+
+        for attribute, values in [('nationality', nationality), ('unit_type', unit_type), ('branch', branch),
+                                  ('player', player)]:
+            if values is None:
+                continue
+
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+
+            matching_ids = set()
+            for value in values:
+                matching_ids.update(self.indexes[attribute].get(value, []))
+
+            unit_ids = matching_ids if unit_ids is None else unit_ids & matching_ids
+
+        if unit_ids is None:
+            return list(self.units)
+
+        return [self.by_unit_id[x] for x in sorted(unit_ids)]
+
+
+def load_registry():
+    global registry
+
+    if registry is None:
+        registry = UnitRegistry(load_catalog().combat_units())
+
+    return registry